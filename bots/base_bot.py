@@ -1,17 +1,146 @@
+import json
+import asyncio
+import hashlib
 from abc import ABC, abstractmethod
-from core.database import Neo4jConnector
-from neo4j import GraphDatabase
+from core.database import get_connector, get_async_connector, is_write_query
+from core.cypher_params import parameterize, ParameterizedQuery, fingerprint
+from core.results import inject_limit, is_ordered, row_limits
 
 class BaseBot(ABC):
+    # Bump when generation or execution changes in a way prompt_template() does not show
+    version = "2"
+
     def __init__(self):
-        self.db = Neo4jConnector("bolt://localhost:7687", "neo4j", "yourpassword")
+        # Shared per process, so bots that wrap other bots reuse one driver pool
+        self.db = get_connector()
+        self._adb = None
+        # Caps on what one generated query may return (RESULT_MAX_ROWS, RESULT_MAX_BYTES)
+        self.max_rows, self.max_bytes = row_limits()
+
+    @property
+    def adb(self):
+        """Async connector, created on first use from the event loop"""
+        if self._adb is None:
+            self._adb = get_async_connector()
+        return self._adb
     
     @abstractmethod
     def generate_cypher(self, natural_query: str) -> str:
         pass
+
+    def prompt_template(self) -> str:
+        """Everything besides the question that shapes generation, e.g. the prompt with placeholders"""
+        return ""
+
+    def eval_fingerprint(self):
+        """Hash of the bot's identity, version, model and prompt; evaluation results are keyed by it"""
+        llm = getattr(self, "llm", None)
+        payload = {
+            "bot": type(self).__name__,
+            "version": self.version,
+            "model": getattr(llm, "model", None),
+            "temperature": getattr(llm, "temperature", None),
+            "prompt": self.prompt_template(),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
     
-    def execute_cypher(self, cypher_query):
-       return self.db.execute_query(query=cypher_query)
+    def prepare_cypher(self, cypher_query):
+        """Lift literals into parameters so Neo4j reuses one plan per query shape"""
+        try:
+            return parameterize(cypher_query)
+        except ValueError:
+            # Malformed literals: let Neo4j report the syntax error on the raw query
+            return ParameterizedQuery(cypher_query, {}, fingerprint(cypher_query))
+
+    def bound_cypher(self, cypher_query, params=None, skip=0):
+        """Prepared ``(query, params, pageable)`` for running generated Cypher under the row limit.
+
+        Unbounded reads get ``SKIP``/``LIMIT`` appended, fetching one row past
+        ``max_rows`` so truncation can be detected. Only those that also
+        ``ORDER BY`` are pageable: without an order Neo4j may return rows in a
+        different order on each run, and a later page could repeat or skip rows.
+        """
+        prepared = self.prepare_cypher(cypher_query)
+        params = {**prepared.params, **(params or {})}
+        paged = None if is_write_query(prepared.query) else inject_limit(prepared.query)
+        if paged is None:
+            return prepared.query, params, False
+        return paged, {**params, "page_skip": skip, "page_limit": self.max_rows + 1}, is_ordered(prepared.query)
+
+    def preflight(self, cypher_query, params=None):
+        """EXPLAIN verdict for generated Cypher; None for writes or with the guard disabled.
+
+        Raises QueryRejected when the plan is too expensive to run.
+        """
+        guard = self.db.guard
+        prepared = self.prepare_cypher(cypher_query)
+        if guard is None or is_write_query(prepared.query):
+            return None
+        return guard.check(prepared.query, {**prepared.params, **(params or {})})
+
+    async def apreflight(self, cypher_query, params=None):
+        guard = self.db.guard
+        prepared = self.prepare_cypher(cypher_query)
+        if guard is None or is_write_query(prepared.query):
+            return None
+        return await guard.acheck(prepared.query, {**prepared.params, **(params or {})}, self.adb)
+
+    def execute_cypher(self, cypher_query, params=None, skip=0, limited=True):
+        """Run generated Cypher; with ``limited=False`` (evaluation) every row comes back"""
+        verdict = self.preflight(cypher_query, params)
+        if limited:
+            query, params, _ = self.bound_cypher(cypher_query, params, skip)
+            max_rows, max_bytes = self.max_rows, self.max_bytes
+        else:
+            prepared = self.prepare_cypher(cypher_query)
+            query, params = prepared.query, {**prepared.params, **(params or {})}
+            max_rows = max_bytes = None
+        taken = self.db.guard.acquire(verdict) if verdict else False
+        try:
+            return self.db.execute_query(query=query, params=params, max_rows=max_rows, max_bytes=max_bytes)
+        finally:
+            if taken:
+                self.db.guard.release(taken)
+
+    async def aexecute_cypher(self, cypher_query, params=None, skip=0):
+        verdict = await self.apreflight(cypher_query, params)
+        query, params, _ = self.bound_cypher(cypher_query, params, skip)
+        taken = await self.db.guard.aacquire(verdict) if verdict else False
+        try:
+            return await self.adb.execute_query(
+                query=query, params=params, max_rows=self.max_rows, max_bytes=self.max_bytes
+            )
+        finally:
+            if taken:
+                self.db.guard.release(taken)
+
+    async def aexecute_cypher_batch(self, statements):
+        """Run ``(cypher, params)`` pairs together; one result list or exception per pair"""
+        verdicts = await asyncio.gather(
+            *(self.apreflight(cypher_query, params) for cypher_query, params in statements), return_exceptions=True
+        )
+        results = [None] * len(statements)
+        runnable = []
+        for i, verdict in enumerate(verdicts):
+            if isinstance(verdict, Exception):
+                results[i] = verdict
+            else:
+                runnable.append(i)
+        # The batch shares one transaction, so it takes one slot if any query needs throttling
+        throttled = next((v for v in verdicts if v is not None and not isinstance(v, Exception)
+                          and v.action == "throttle"), None)
+        taken = await self.db.guard.aacquire(throttled) if throttled else False
+        try:
+            executed = await self.adb.execute_batch(
+                [self.bound_cypher(*statements[i])[:2] for i in runnable],
+                max_rows=self.max_rows, max_bytes=self.max_bytes,
+            )
+        finally:
+            if taken:
+                self.db.guard.release(taken)
+        for i, rows in zip(runnable, executed):
+            results[i] = rows
+        return results
     
     def get_schema(self):
         return self.db.get_schema()
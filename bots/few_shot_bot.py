@@ -3,10 +3,11 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from base_bot import BaseBot
-from core.evaluator import CypherEvaluator
-from scripts.generate_dataset import DatasetManager
+from core.eval_runner import evaluate_bot
 import pandas as pd
 from langchain.chat_models import ChatOpenAI
+from core.llm_cache import CachedChatModel
+from core.utils import run_blocking
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -51,25 +52,14 @@ class FewShotBot(BaseBot):
     def __init__(self):
         super().__init__()
         self.evaluator = None
-        self.llm = ChatOpenAI(model="gpt-4", temperature=0)
+        self.llm = CachedChatModel(ChatOpenAI(model="gpt-4", temperature=0))
         self.example_query = example_query
 
     def knowledge_graph_schema(self):
-        nodes, relationships = self.get_schema()
-        # Convert Schema to Text
-        schema_text = f"""
-        Graph Schema:
-
-        Nodes:
-        {nodes}
-
-        Relationships:
-        {relationships}
-        """
-        return schema_text
+        # Rendered once per schema version, see core/schema_cache.py
+        return self.db.schema_cache.text()
         
-    def generate_cypher(self, natural_query: str) -> str:
-        """Generate Cypher without RAG context"""
+    def build_messages(self, natural_query: str):
         system_prompt = f"""
                     "You are an expert in Neo4j Cypher queries. 
                     Given a user question and the schema, generate the correct Cypher query.
@@ -88,40 +78,26 @@ class FewShotBot(BaseBot):
             ("system", system_prompt),
             ("human", human_prompt),
         ]
-        
-        response = self.llm.invoke(messages)
+        return messages
+
+    def prompt_template(self):
+        # Includes the rendered schema, so a schema change re-scores the bot
+        return str(self.build_messages("{question}"))
+
+    def generate_cypher(self, natural_query: str) -> str:
+        """Generate Cypher without RAG context"""
+        response = self.llm.invoke(self.build_messages(natural_query))
+        return response.content.split("Cypher Query: ")[-1].strip()
+
+    async def agenerate_cypher(self, natural_query: str) -> str:
+        # The schema comes from a cache that may need a (sync) refresh, so build off the loop
+        messages = await run_blocking(self.build_messages, natural_query)
+        response = await self.llm.ainvoke(messages)
         return response.content.split("Cypher Query: ")[-1].strip()
 
     def evaluate(self):
         """Evaluate on test dataset"""
-        # Load data
-        dm = DatasetManager()
-        _, test_df = dm.get_dataset()
-        
-        # Generate results
-        bot_results = []
-        for _, row in test_df.iterrows():
-            try:
-                cypher = self.generate_cypher(row['question'])
-                result = self.execute_cypher(cypher)
-                bot_results.append({
-                    'question': row['question'],
-                    'generated_cypher': cypher,
-                    'generated_answer': result
-                })
-            except Exception as e:
-                print(f"Error processing {row['question']}: {str(e)}")
-        
-        # Evaluate
-        self.evaluator = CypherEvaluator(test_df)
-        eval_df = self.evaluator.evaluate(bot_results)
-        eval_df.to_csv("data/few_shot_results.csv", index=False)
-        
-        # Generate report
-        report = self.evaluator.generate_report(eval_df)
-        print("\n📊 Few Shot Bot Evaluation Summary:")
-        self.write_evaluation_summary(report, "Few Shot Bot")
-        
+        return evaluate_bot(self, "data/few_shot_results.csv", "Few Shot Bot")
 
 if __name__ == "__main__":
     bot = FewShotBot()
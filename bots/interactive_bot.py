@@ -2,20 +2,82 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import time
+import asyncio
 from base_bot import BaseBot
 from few_shot_bot import FewShotBot
 from langchain.chat_models import ChatOpenAI
+from core.llm_cache import CachedChatModel
+from core.entities import EntityExtractor
+from core.semantic_cache import SemanticCache
+from core.intent_router import IntentRouter
+from core.answer_renderer import AnswerRenderer, summarize_results
+from core.utils import run_blocking
+from core.coalesce import normalize_question
+from core.results import CursorStore, RowBudget, Rows
+
+BUSINESS_HOURS_ANSWER = "We are open from 7 am to 6 pm, Monday to Friday."
 
 class InteractiveBot(BaseBot):
     def __init__(self):
         super().__init__()  # Initialize Neo4j connection from BaseBot
-        self.llm = ChatOpenAI(model="gpt-4", temperature=0)
+        self.llm = CachedChatModel(ChatOpenAI(model="gpt-4", temperature=0))
         self.few_shot_bot = FewShotBot()
+        self.entity_extractor = EntityExtractor(self.db)
+        self.semantic_cache = None
+        if os.getenv("SEMANTIC_CACHE_DISABLED") != "1":
+            self.semantic_cache = SemanticCache(extractor=self.entity_extractor)
+        self.router = IntentRouter(self.entity_extractor)
+        self.renderer = AnswerRenderer()
+        self.cursors = CursorStore()
+
     def generate_cypher(self, query):
+        cypher, cypher_answer, _ = self._generate_cypher(query)
+        return cypher, cypher_answer
+
+    def _generate_cypher(self, query):
+        """Like generate_cypher, plus whether an LLM call was needed"""
+        cypher = self.semantic_cache.lookup(query) if self.semantic_cache else None
+        if cypher is not None:
+            return cypher, self.execute_cypher(cypher), False
+
+        start = time.perf_counter()
         cypher = self.few_shot_bot.generate_cypher(query)
+        if self.semantic_cache:
+            self.semantic_cache.record_llm_latency(time.perf_counter() - start)
         cypher_answer = self.execute_cypher(cypher)
-        return cypher, cypher_answer
-    def generate_answer(self, questions, cypher=None, cypher_answer=None):
+        # Only Cypher that ran without error is offered to later paraphrases
+        if self.semantic_cache:
+            self.semantic_cache.store(query, cypher)
+        return cypher, cypher_answer, True
+
+    async def _achoose_cypher(self, query):
+        """Cypher from the semantic cache or the LLM, plus whether the LLM was used"""
+        cypher = await run_blocking(self.semantic_cache.lookup, query) if self.semantic_cache else None
+        if cypher is not None:
+            return cypher, False
+
+        start = time.perf_counter()
+        cypher = await self.few_shot_bot.agenerate_cypher(query)
+        if self.semantic_cache:
+            self.semantic_cache.record_llm_latency(time.perf_counter() - start)
+        return cypher, True
+
+    async def _agenerate_cypher(self, query):
+        cypher, used_llm = await self._achoose_cypher(query)
+        cypher_answer = await self.aexecute_cypher(cypher)
+        if used_llm and self.semantic_cache:
+            await run_blocking(self.semantic_cache.store, query, cypher)
+        return cypher, cypher_answer, used_llm
+
+    def render_answer(self, questions, cypher_answer, intent=None, params=None):
+        """Phrase common result shapes without the LLM; None if the LLM is needed"""
+        return self.renderer.render(questions, cypher_answer, intent, params)
+
+    def _answer_prompt(self, questions, cypher=None, cypher_answer=None):
+        if cypher_answer is not None:
+            # Large results are summarized so the prompt stays bounded
+            cypher_answer = summarize_results(cypher_answer)
         prompt = f"""
             You are a helpful business assistant that answers question about Logistics or business. 
             You can answer questions about the business’s working hours
@@ -25,9 +87,220 @@ class InteractiveBot(BaseBot):
             Here is the answer from executing that cypher on the knowledge graph: {cypher_answer}
             Answer the user query: {questions}
         """
-        response = self.llm.invoke(prompt)
+        return prompt
+
+    def generate_answer(self, questions, cypher=None, cypher_answer=None):
+        response = self.llm.invoke(self._answer_prompt(questions, cypher, cypher_answer))
+        return response.content
+
+    async def agenerate_answer(self, questions, cypher=None, cypher_answer=None):
+        response = await self.llm.ainvoke(self._answer_prompt(questions, cypher, cypher_answer))
         return response.content
 
+    def _local_answer(self, route, user_input, cypher_answer):
+        # An empty result from LLM-written Cypher may just mean the question was not about data
+        if cypher_answer or route.cypher is not None:
+            return self.render_answer(user_input, cypher_answer, route.intent, route.params)
+        return None
+
+    def _reply(self, route, answer, used_llm, cypher=None, cypher_answer=None, params=None, open_cursor=True):
+        self.router.record_served(used_llm=used_llm)
+        if route.cypher == "":
+            return {"response": answer, "intent": route.intent, "truncated": False}
+        reply = {"response": answer, "cypher": cypher, "cypher_answer": cypher_answer, "intent": route.intent}
+        reply.update(self._page_info(cypher, params, cypher_answer, offset=0, open_cursor=open_cursor))
+        return reply
+
+    def _page_info(self, cypher, params, rows, offset, token=None, open_cursor=True):
+        """``truncated`` flag and, when more rows can be fetched, a ``cursor`` for them.
+
+        With ``open_cursor=False`` the reply carries ``page_state`` instead, for
+        open_cursor() to turn into a cursor per caller of a shared reply.
+        """
+        truncated = bool(getattr(rows, "truncated", False))
+        if not truncated or not self.bound_cypher(cypher, params)[2]:
+            return {"truncated": truncated, "cursor": None}
+        offset += len(rows)
+        if not open_cursor:
+            return {"truncated": True, "cursor": None, "page_state": (cypher, dict(params or {}), offset)}
+        if token:
+            token = self.cursors.token(token, offset)
+        else:
+            token = self.cursors.open(cypher, params, offset)
+        return {"truncated": True, "cursor": token}
+
+    def open_cursor(self, reply):
+        """Copy of a reply made with ``open_cursor=False``, with a cursor of its own"""
+        reply = dict(reply)
+        page_state = reply.pop("page_state", None)
+        if page_state is not None:
+            reply["cursor"] = self.cursors.open(*page_state)
+        return reply
+
+    def next_page(self, cursor):
+        """Next rows for a cursor from an earlier reply, or None if it has expired"""
+        entry = self.cursors.get(cursor)
+        if entry is None:
+            return None
+        cypher, params, offset = entry
+        rows = self.execute_cypher(cypher, params, skip=offset)
+        return {"rows": rows, **self._page_info(cypher, params, rows, offset, token=cursor)}
+
+    async def anext_page(self, cursor):
+        entry = self.cursors.get(cursor)
+        if entry is None:
+            return None
+        cypher, params, offset = entry
+        rows = await self.aexecute_cypher(cypher, params, skip=offset)
+        return {"rows": rows, **self._page_info(cypher, params, rows, offset, token=cursor)}
+
+    def respond(self, user_input):
+        """Answer one chat message, using a Cypher template when the intent is clear"""
+        route = self.router.route(user_input)
+        if route.cypher == "":
+            return self._reply(route, BUSINESS_HOURS_ANSWER, used_llm=False)
+        if route.cypher is not None:
+            cypher, cypher_answer, used_llm = route.cypher, self.execute_cypher(route.cypher, route.params), False
+        else:
+            cypher, cypher_answer, used_llm = self._generate_cypher(user_input)
+        answer = self._local_answer(route, user_input, cypher_answer)
+        if answer is None:
+            answer = self.generate_answer(user_input, cypher, cypher_answer)
+            used_llm = True
+        return self._reply(route, answer, used_llm, cypher, cypher_answer, route.params)
+
+    async def arespond(self, user_input, open_cursor=True):
+        """Async respond: Neo4j and LLM calls are awaited, CPU-bound steps use the bounded pool.
+
+        Pass ``open_cursor=False`` when the reply is shared between callers; see open_cursor().
+        """
+        route = await run_blocking(self.router.route, user_input)
+        if route.cypher == "":
+            return self._reply(route, BUSINESS_HOURS_ANSWER, used_llm=False)
+        if route.cypher is not None:
+            cypher, cypher_answer, used_llm = route.cypher, await self.aexecute_cypher(route.cypher, route.params), False
+        else:
+            cypher, cypher_answer, used_llm = await self._agenerate_cypher(user_input)
+        answer = self._local_answer(route, user_input, cypher_answer)
+        if answer is None:
+            answer = await self.agenerate_answer(user_input, cypher, cypher_answer)
+            used_llm = True
+        return self._reply(route, answer, used_llm, cypher, cypher_answer, route.params, open_cursor)
+
+    async def _aplan(self, question, limit):
+        """Route one question, generating Cypher with the LLM if no template fits"""
+        route = await run_blocking(self.router.route, question)
+        if route.cypher is not None:
+            return route, route.cypher, route.params, False
+        async with limit:
+            cypher, used_llm = await self._achoose_cypher(question)
+        return route, cypher, {}, used_llm
+
+    async def _abatch_reply(self, question, plan, cypher_answer, limit):
+        route, cypher, params, used_llm = plan
+        if route.cypher == "":
+            return self._reply(route, BUSINESS_HOURS_ANSWER, used_llm=False)
+        if isinstance(cypher_answer, Exception):
+            return {"error": str(cypher_answer), "cypher": cypher, "intent": route.intent}
+        answer = self._local_answer(route, question, cypher_answer)
+        if answer is None:
+            async with limit:
+                answer = await self.agenerate_answer(question, cypher, cypher_answer)
+            used_llm = True
+        return self._reply(route, answer, used_llm, cypher, cypher_answer, params)
+
+    async def answer_batch(self, questions, concurrency=None):
+        """Answer many questions, yielding ``(index, reply)`` in input order.
+
+        Repeated questions are answered once. Cypher for the rest is generated
+        concurrently (at most ``BATCH_CONCURRENCY`` LLM calls at a time), then
+        every query runs together through AsyncNeo4jConnector.execute_batch, so
+        identical shapes share one UNWIND query and one transaction. Answers are
+        phrased concurrently and each is yielded as soon as those before it are.
+        """
+        limit = asyncio.Semaphore(concurrency or int(os.getenv("BATCH_CONCURRENCY", 8)))
+        first = {}
+        for question in questions:
+            first.setdefault(normalize_question(question), question)
+        unique = list(first.values())
+
+        plans = await asyncio.gather(*(self._aplan(q, limit) for q in unique), return_exceptions=True)
+        runnable = [i for i, plan in enumerate(plans) if not isinstance(plan, Exception) and plan[1]]
+        executed = await self.aexecute_cypher_batch([(plans[i][1], plans[i][2]) for i in runnable])
+        cypher_answers = dict(zip(runnable, executed))
+        for i in runnable:
+            # Only Cypher that ran without error is offered to later paraphrases
+            if plans[i][3] and self.semantic_cache and not isinstance(cypher_answers[i], Exception):
+                await run_blocking(self.semantic_cache.store, unique[i], plans[i][1])
+
+        async def reply(i):
+            if isinstance(plans[i], Exception):
+                return {"error": str(plans[i])}
+            try:
+                return await self._abatch_reply(unique[i], plans[i], cypher_answers.get(i), limit)
+            except Exception as e:
+                return {"error": str(e), "cypher": plans[i][1], "intent": plans[i][0].intent}
+
+        tasks = {question: asyncio.ensure_future(reply(i)) for i, question in enumerate(unique)}
+        try:
+            for index, question in enumerate(questions):
+                yield index, await tasks[first[normalize_question(question)]]
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    async def astream_respond(self, user_input, page_size=100):
+        """Yield ``(event, data)`` as each stage finishes: cypher, pages of rows, answer tokens, done"""
+        route = await run_blocking(self.router.route, user_input)
+        if route.cypher == "":
+            yield "answer", {"token": BUSINESS_HOURS_ANSWER}
+            self.router.record_served(used_llm=False)
+            yield "done", {"intent": route.intent, "used_llm": False, "truncated": False}
+            return
+        if route.cypher is not None:
+            cypher, params, used_llm = route.cypher, route.params, False
+        else:
+            (cypher, used_llm), params = await self._achoose_cypher(user_input), {}
+        yield "cypher", {"cypher": cypher, "intent": route.intent}
+
+        verdict = await self.apreflight(cypher, params)
+        query, bound_params, _ = self.bound_cypher(cypher, params)
+        budget = RowBudget(self.max_rows, self.max_bytes)
+        cypher_answer = []
+        pages = self.adb.stream(query, bound_params, page_size=page_size)
+        taken = await self.db.guard.aacquire(verdict) if verdict else False
+        try:
+            async for page in pages:
+                admitted = []
+                for row in page:
+                    if not budget.admit(row):
+                        break
+                    admitted.append(row)
+                cypher_answer.extend(admitted)
+                if admitted:
+                    yield "rows", {"rows": admitted, "total": len(cypher_answer)}
+                if budget.truncated:
+                    break
+        finally:
+            await pages.aclose()
+            if taken:
+                self.db.guard.release(taken)
+        cypher_answer = Rows(cypher_answer, budget.truncated)
+        if used_llm and self.semantic_cache:
+            await run_blocking(self.semantic_cache.store, user_input, cypher)
+
+        answer = self._local_answer(route, user_input, cypher_answer)
+        if answer is not None:
+            yield "answer", {"token": answer}
+        else:
+            used_llm = True
+            async for token in self.llm.astream(self._answer_prompt(user_input, cypher, cypher_answer)):
+                yield "answer", {"token": token}
+        self.router.record_served(used_llm=used_llm)
+        yield "done", {
+            "intent": route.intent, "used_llm": used_llm, **self._page_info(cypher, params, cypher_answer, offset=0)
+        }
+
     
 if __name__ == "__main__":
     bot = InteractiveBot()
@@ -35,8 +308,4 @@ if __name__ == "__main__":
         user_input = input("Ask me anything (exit to quit): ")
         if user_input == "exit":
             break
-        if "hours" in user_input or "work" in user_input or "business" in user_input or "open" in user_input:
-            print(f"🤖 Bot: {bot.generate_answer(user_input)}")
-        else:
-            cypher, cypher_answer = bot.generate_cypher(user_input)
-            print(f"🤖 Bot: {bot.generate_answer(user_input, cypher, cypher_answer)}")
+        print(f"🤖 Bot: {bot.respond(user_input)['response']}")
@@ -3,10 +3,10 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from base_bot import BaseBot
-from core.evaluator import CypherEvaluator
-from scripts.generate_dataset import DatasetManager
+from core.eval_runner import evaluate_bot
 import pandas as pd
 from langchain.chat_models import ChatOpenAI
+from core.llm_cache import CachedChatModel
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,11 +15,10 @@ class NoContextBot(BaseBot):
     def __init__(self):
         super().__init__()
         self.evaluator = None
-        self.llm = ChatOpenAI(model="gpt-4", temperature=0)
+        self.llm = CachedChatModel(ChatOpenAI(model="gpt-4", temperature=0))
         
-    def generate_cypher(self, natural_query: str) -> str:
-        """Generate Cypher without RAG context"""
-        prompt = f"""
+    def build_prompt(self, natural_query: str) -> str:
+        return f"""
         You are a helpful Neo4j Cypher expert. 
         Generate a query for:
         {natural_query}
@@ -27,38 +26,18 @@ class NoContextBot(BaseBot):
         Return ONLY the Cypher query in this format:
         Cypher Query: <cypher>
         """
-        response = self.llm.invoke(prompt)
+
+    def prompt_template(self):
+        return self.build_prompt("{question}")
+
+    def generate_cypher(self, natural_query: str) -> str:
+        """Generate Cypher without RAG context"""
+        response = self.llm.invoke(self.build_prompt(natural_query))
         return response.content.split("Cypher Query: ")[-1].strip()
 
     def evaluate(self):
         """Evaluate on test dataset"""
-        # Load data
-        dm = DatasetManager()
-        _, test_df = dm.get_dataset()
-        
-        # Generate results
-        bot_results = []
-        for _, row in test_df.iterrows():
-            try:
-                cypher = self.generate_cypher(row['question'])
-                result = self.execute_cypher(cypher)
-                bot_results.append({
-                    'question': row['question'],
-                    'generated_cypher': cypher,
-                    'generated_answer': result
-                })
-            except Exception as e:
-                print(f"Error processing {row['question']}: {str(e)}")
-        
-        # Evaluate
-        self.evaluator = CypherEvaluator(test_df)
-        eval_df = self.evaluator.evaluate(bot_results)
-        eval_df.to_csv("data/no_context_results.csv", index=False)
-        
-        # Generate report
-        report = self.evaluator.generate_report(eval_df)
-        print("\n📊 No Context Bot Evaluation Summary:")
-        self.write_evaluation_summary(report, "No Context Bot")
+        return evaluate_bot(self, "data/no_context_results.csv", "No Context Bot")
 
 if __name__ == "__main__":
     bot = NoContextBot()
@@ -3,41 +3,36 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.vectorstores import FAISS
-from langchain.schema import Document
 from dotenv import load_dotenv
 import pandas as pd
 from base_bot import BaseBot
-from scripts.generate_dataset import DatasetManager
-from core.evaluator import CypherEvaluator
+from core.eval_runner import evaluate_bot
 from langchain.chat_models import ChatOpenAI
+from core.llm_cache import CachedChatModel
+from core.example_index import ExampleIndex
+from core.embeddings import get_embeddings
 
 load_dotenv()
 
 class RagBot(BaseBot):
     def __init__(self):
         super().__init__()  # Initialize Neo4j connection from BaseBot
-        self.vector_store = None
+        # One persistent index (and retriever) for the life of the bot
+        self.example_index = ExampleIndex(get_embeddings())
         self.evaluator = None
-        self.llm = ChatOpenAI(model="gpt-4")
+        self.llm = CachedChatModel(ChatOpenAI(model="gpt-4"))
 
     def _prepare_vector_store(self, train_df: pd.DataFrame):
-        """Create FAISS vector store from training data"""
+        """Bring the persistent example index up to date with the training data"""
         train_docs = [
-            Document(
-                page_content=f"Q: {row['question']}\nCypher: {row['cypher']}\nAnswer: {row['expected_output']}",
-            )
+            f"Q: {row['question']}\nCypher: {row['cypher']}\nAnswer: {row['expected_output']}"
             for _, row in train_df.iterrows()
         ]
-        self.vector_store = FAISS.from_documents(train_docs, OpenAIEmbeddings())
+        self.example_index.sync(train_docs)
+        print(f"🔎 Example index: {len(self.example_index.texts)} examples, {self.example_index.embedded} newly embedded")
 
-    def generate_cypher(self, user_query: str) -> str:
-        """Generate Cypher using RAG approach"""
-        retriever = self.vector_store.as_retriever(search_type="similarity", k=3)
-        context = "\n\n".join([doc.page_content for doc in retriever.get_relevant_documents(user_query)])
-        
-        prompt = f"""
+    def build_prompt(self, context: str, user_query: str) -> str:
+        return f"""
         You are an expert Cypher query assistant. Given the following context:
         {context}
         
@@ -46,41 +41,24 @@ class RagBot(BaseBot):
         Return ONLY the Cypher query in this format:
         Cypher Query: <cypher>
         """
-        response = self.llm.invoke(prompt)
+
+    def prompt_template(self):
+        # Retrieved context depends on the example library and the model that embeds it, so both count too
+        return "\n".join([
+            self.build_prompt("{context}", "{question}"),
+            f"embeddings: {self.example_index.embeddings.model_name}",
+            *map(str, sorted(self.example_index.texts)),
+        ])
+
+    def generate_cypher(self, user_query: str) -> str:
+        """Generate Cypher using RAG approach"""
+        context = "\n\n".join(self.example_index.search(user_query, k=3))
+        response = self.llm.invoke(self.build_prompt(context, user_query))
         return response.content.split("Cypher Query: ")[-1].strip()
     
     def evaluate(self):
         """Evaluate on test dataset"""
-        # 1. Load data
-        dm = DatasetManager()
-        train_df, test_df = dm.get_dataset()
-
-        # 2. Prepare RAG components
-        self._prepare_vector_store(train_df)
-        
-        # Generate results
-        bot_results = []
-        for _, row in test_df.iterrows():
-            try:
-                cypher = self.generate_cypher(row['question'])
-                result = self.execute_cypher(cypher)
-                bot_results.append({
-                    'question': row['question'],
-                    'generated_cypher': cypher,
-                    'generated_answer': result
-                })
-            except Exception as e:
-                print(f"Error processing {row['question']}: {str(e)}")
-        
-        # Evaluate
-        self.evaluator = CypherEvaluator(test_df)
-        eval_df = self.evaluator.evaluate(bot_results)
-        eval_df.to_csv("data/rag_evaluation_results.csv", index=False)
-        
-        # Generate report
-        report = self.evaluator.generate_report(eval_df)
-        print("\n📊 RAG Bot Evaluation Summary:")
-        self.write_evaluation_summary(report, "RAG Bot")
+        return evaluate_bot(self, "data/rag_evaluation_results.csv", "RAG Bot", prepare=self._prepare_vector_store)
 
 if __name__ == "__main__":
     bot = RagBot()
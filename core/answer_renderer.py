@@ -0,0 +1,86 @@
+# core/answer_renderer.py
+import os
+import json
+
+INTENT_PHRASES = {
+    "shipment_status": "The status of shipment {tracking_number} is {value}.",
+    "dispatch_location": "Shipment {tracking_number} was dispatched from {value}.",
+    "delivery_location": "Shipment {tracking_number} is being delivered to {value}.",
+    "courier_assignment": "The courier assigned to shipment {tracking_number} is {value}.",
+}
+
+
+def _label(column):
+    """'s.expected_delivery_date' -> 'expected delivery date', 'count(s)' -> 'count'"""
+    return column.split("(")[0].split(".")[-1].replace("_", " ").strip()
+
+
+def _join(values, limit):
+    shown = ", ".join(str(v) for v in values[:limit])
+    if len(values) > limit:
+        shown += f" and {len(values) - limit} more"
+    return shown
+
+
+def summarize_results(results, max_rows=None, max_chars=None):
+    """Compact JSON of a result list for prompts, truncated by rows and characters"""
+    max_rows = max_rows or int(os.getenv("ANSWER_PROMPT_MAX_ROWS", 20))
+    max_chars = max_chars or int(os.getenv("ANSWER_PROMPT_MAX_CHARS", 4000))
+    if not isinstance(results, list):
+        return str(results)[:max_chars]
+    text = json.dumps(results[:max_rows], default=str)
+    if len(text) > max_chars:
+        text = text[:max_chars] + "..."
+    if len(results) > max_rows:
+        text += f" (showing {max_rows} of {len(results)} rows)"
+    if getattr(results, "truncated", False):
+        text += " (the query returned more rows than were fetched)"
+    return text
+
+
+class AnswerRenderer:
+    """Phrases common result shapes locally; ``render`` returns None when the LLM is needed"""
+
+    def __init__(self, list_limit=25):
+        self.list_limit = list_limit
+
+    def render(self, question, results, intent=None, params=None):
+        if not isinstance(results, list) or not all(isinstance(row, dict) for row in results):
+            return None
+        params = params or {}
+        if not results:
+            return "I couldn't find any matching records."
+
+        columns = list(results[0])
+        if len(results) == 1 and len(columns) == 1:
+            return self._scalar(columns[0], results[0][columns[0]], intent, params)
+        if len(results) == 1:
+            return self._record(results[0])
+        if len(columns) == 1:
+            values = [row.get(columns[0]) for row in results]
+            count = f"more than {len(values)}" if getattr(results, "truncated", False) else len(values)
+            if columns[0].endswith("tracking_number"):
+                return f"I found {count} shipments: {_join(values, self.list_limit)}."
+            return f"I found {count} results for {_label(columns[0])}: {_join(values, self.list_limit)}."
+        return None
+
+    def _scalar(self, column, value, intent, params):
+        tracking_number = params.get("tracking_number")
+        if value is None:
+            subject = f" for shipment {tracking_number}" if tracking_number else ""
+            return f"No {_label(column)} is recorded{subject}."
+        if intent in INTENT_PHRASES and tracking_number:
+            return INTENT_PHRASES[intent].format(tracking_number=tracking_number, value=value)
+        if isinstance(value, (list, dict)):
+            return None
+        return f"The {_label(column)} is {value}."
+
+    def _record(self, record):
+        if any(isinstance(v, (list, dict)) for v in record.values()):
+            return None
+        fields = [f"{_label(k)}: {v}" for k, v in record.items() if v is not None and not k.endswith("tracking_number")]
+        tracking = next((v for k, v in record.items() if k.endswith("tracking_number")), None)
+        prefix = f"Shipment {tracking}" if tracking else "Here is what I found"
+        if not fields:
+            return f"{prefix} has no further details recorded." if tracking else None
+        return f"{prefix} - " + "; ".join(fields) + "."
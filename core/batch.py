@@ -0,0 +1,131 @@
+# core/batch.py
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+from core.cypher_params import mask_nested
+
+ROW = "__row"
+ROWS = "__rows"
+INDEX = "__index"
+LIMIT = "__limit"
+
+_PARAM = re.compile(r"`[^`]*`|\$(\w+)")
+_ALIAS = re.compile(r"\s+AS\s+(`[^`]+`|\w+)$", re.IGNORECASE)
+_VARIABLE = re.compile(r"^[A-Za-z_]\w*$")
+_RETURN = re.compile(r"\bRETURN\s+(DISTINCT\s+)?", re.IGNORECASE)
+_RETURN_TAIL = re.compile(r"\b(ORDER\s+BY|SKIP|LIMIT)\b", re.IGNORECASE)
+# Clauses that break the per-row scope the merged query relies on
+_UNBATCHABLE = re.compile(r"\b(UNION|WITH)\b", re.IGNORECASE)
+
+
+class BatchGroup(NamedTuple):
+    indices: List[int]
+    query: str
+    params: Dict[str, Any]
+    columns: Optional[List[str]]  # None when the group is a single unmerged query
+
+
+def return_columns(query):
+    """(alias tokens, column names) of the final RETURN, or None if it cannot be merged.
+
+    Merging needs every returned item to be aliased or a bare variable, so the
+    wrapping query can return it by name.
+    """
+    if "'" in query or '"' in query:
+        return None  # literals were not lifted into parameters
+    flat = mask_nested(query)
+    if _UNBATCHABLE.search(flat):
+        return None
+    returns = list(_RETURN.finditer(flat))
+    if not returns:
+        return None
+    start = returns[-1].end()
+    tail = _RETURN_TAIL.search(flat, start)
+    end = tail.start() if tail else len(query)
+
+    tokens, names = [], []
+    item_start = start
+    for pos in [i for i in range(start, end) if flat[i] == ","] + [end]:
+        item = query[item_start:pos].strip()
+        item_start = pos + 1
+        alias = _ALIAS.search(item)
+        token = alias.group(1) if alias else item
+        if not alias and not _VARIABLE.match(item):
+            return None
+        tokens.append(token)
+        names.append(token.strip("`"))
+    if INDEX in names:
+        return None
+    return tokens, names
+
+
+def _bound_by(query, names):
+    """True if any of ``names`` is used as a SKIP or LIMIT value, which must stay a parameter"""
+    return any(re.search(rf"\b(SKIP|LIMIT)\s+\${re.escape(name)}\b", query, re.IGNORECASE) for name in names)
+
+
+def unwind_query(query, tokens, varying, limit=False):
+    """Wrap a parameterized query so one run answers a list of parameter rows.
+
+    Parameters named in ``varying`` are read from each row; the rest stay
+    ordinary parameters shared by every row. With ``limit`` each row returns
+    at most ``$__limit`` records, so no row can crowd out the others.
+    """
+    def substitute(match):
+        name = match.group(1)
+        return f"{ROW}.{name}" if name in varying else match.group(0)
+
+    body = _PARAM.sub(substitute, query)
+    if limit:
+        # Nested, so a LIMIT the query already has is left alone
+        body = f"CALL {{ WITH {ROW} {body} }} RETURN " + ", ".join(tokens) + f" LIMIT ${LIMIT}"
+    return (
+        f"UNWIND ${ROWS} AS {ROW} CALL {{ WITH {ROW} {body} }} "
+        f"RETURN {ROW}.{INDEX} AS {INDEX}, " + ", ".join(tokens)
+    )
+
+
+def plan_batch(statements, indices=None, limit=None):
+    """Group parameterized ``(query, params)`` statements into as few queries as possible.
+
+    Statements with identical text differ only in their parameters, so each
+    such group becomes one ``UNWIND $rows ... CALL { ... }`` query. Groups that
+    cannot be merged are kept as single queries. ``limit`` caps the records
+    each merged statement may return.
+    """
+    indices = list(range(len(statements))) if indices is None else list(indices)
+    by_text = OrderedDict()
+    for index, (query, params) in zip(indices, statements):
+        by_text.setdefault(query, []).append((index, params or {}))
+
+    groups = []
+    for query, members in by_text.items():
+        columns = return_columns(query) if len(members) > 1 else None
+        names = set().union(*(params for _, params in members))
+        shared = {
+            name: members[0][1].get(name) for name in names
+            if all(name in params and params[name] == members[0][1][name] for _, params in members)
+        }
+        varying = names - set(shared)
+        if columns is None or names & {ROWS, LIMIT} or _bound_by(query, varying):
+            groups.extend(BatchGroup([index], query, params, None) for index, params in members)
+            continue
+        tokens, columns = columns
+        rows = [{**{name: params.get(name) for name in varying}, INDEX: index} for index, params in members]
+        merged = {**shared, ROWS: rows}
+        if limit is not None:
+            merged[LIMIT] = limit
+        groups.append(BatchGroup(
+            [index for index, _ in members], unwind_query(query, tokens, varying, limit is not None), merged, columns
+        ))
+    return groups
+
+
+def split_results(group, records):
+    """Map a group's records back to ``{statement index: rows}``"""
+    if group.columns is None:
+        return {group.indices[0]: records}
+    rows = {index: [] for index in group.indices}
+    for record in records:
+        rows[record[INDEX]].append({name: record[name] for name in group.columns})
+    return rows
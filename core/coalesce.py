@@ -0,0 +1,80 @@
+# core/coalesce.py
+import os
+import re
+import time
+import asyncio
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def normalize_question(question):
+    """Case, punctuation and whitespace-insensitive key for a chat question"""
+    return " ".join(_NON_WORD.sub(" ", question.lower()).split())
+
+
+class SingleFlight:
+    """Runs one computation per key at a time; concurrent callers await the same result.
+
+    A finished result is handed to identical requests for ``fresh_for`` seconds
+    and then dropped. The shared work is cancelled only once every caller
+    waiting on it has gone away (for example, all clients disconnected).
+    """
+
+    def __init__(self, fresh_for=None):
+        self.fresh_for = float(os.getenv("COALESCE_FRESH_SECONDS", 2.0) if fresh_for is None else fresh_for)
+        self._inflight = {}  # key -> [task, waiter count]
+        self._recent = {}  # key -> (result, expires_at)
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.fresh_hits = 0
+
+    def _purge(self, now):
+        for key in [k for k, (_, expires_at) in self._recent.items() if expires_at <= now]:
+            del self._recent[key]
+
+    def _finish(self, key, task):
+        self._inflight.pop(key, None)
+        if self.fresh_for > 0 and not task.cancelled() and task.exception() is None:
+            expires_at = time.monotonic() + self.fresh_for
+            self._recent[key] = (task.result(), expires_at)
+            # Drop it on time even if no further request arrives for this key
+            asyncio.get_running_loop().call_later(self.fresh_for, self._expire, key, expires_at)
+
+    def _expire(self, key, expires_at):
+        if key in self._recent and self._recent[key][1] == expires_at:
+            del self._recent[key]
+
+    async def run(self, key, factory):
+        """Return ``await factory()``, sharing it with concurrent calls for ``key``"""
+        self.calls += 1
+        now = time.monotonic()
+        self._purge(now)
+        if key in self._recent:
+            self.fresh_hits += 1
+            return self._recent[key][0]
+
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(factory())
+            entry = self._inflight[key] = [task, 0]
+            task.add_done_callback(lambda t: self._finish(key, t))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                entry[0].cancel()
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "fresh_hits": self.fresh_hits,
+            "in_flight": len(self._inflight),
+        }
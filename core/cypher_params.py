@@ -0,0 +1,152 @@
+# core/cypher_params.py
+import re
+import hashlib
+from typing import Any, Dict, NamedTuple
+
+_NUMBER = re.compile(r"0x[0-9a-fA-F]+|(?:\d+(?:\.\d+)?|\.\d+)(?:[eE][+-]?\d+)?")
+_WORD = re.compile(r"[\w$]")
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "'": "'", '"': '"', "\\": "\\"}
+
+
+class ParameterizedQuery(NamedTuple):
+    query: str
+    params: Dict[str, Any]
+    fingerprint: str
+
+
+def _read_string(query, start):
+    """Return (value, end) for the string literal opening at ``start``"""
+    quote = query[start]
+    chars = []
+    i = start + 1
+    while i < len(query):
+        ch = query[i]
+        if ch == "\\" and i + 1 < len(query):
+            nxt = query[i + 1]
+            if nxt == "u" and i + 5 < len(query):
+                chars.append(chr(int(query[i + 2:i + 6], 16)))
+                i += 6
+                continue
+            chars.append(_ESCAPES.get(nxt, "\\" + nxt))
+            i += 2
+            continue
+        if ch == quote:
+            return "".join(chars), i + 1
+        chars.append(ch)
+        i += 1
+    raise ValueError("Unterminated string literal in Cypher query")
+
+
+def _starts_number(query, i):
+    """A number literal starts at ``i``: a digit, or ``.5`` not following an identifier, ``)`` or ``..``"""
+    previous = query[i - 1] if i else ""
+    if _WORD.match(previous):
+        return False
+    if query[i].isdigit():
+        return True
+    return query[i] == "." and query[i + 1:i + 2].isdigit() and previous not in ".)]}`"
+
+
+def _in_range_literal(query, start, end):
+    """Numbers in variable-length patterns such as ``*1..3`` cannot be parameters"""
+    before = query[:start].rstrip()
+    after = query[end:].lstrip()
+    return before.endswith(("*", "..")) or after.startswith("..")
+
+
+def parameterize(query, prefix="lit"):
+    """Lift string and number literals out of a Cypher query into parameters.
+
+    Structurally identical queries come out with identical text, so Neo4j can
+    reuse one cached plan for them. Comments are dropped and whitespace is
+    collapsed; existing ``$params`` and backtick identifiers are left alone.
+    """
+    out = []
+    params = {}
+    i = 0
+    while i < len(query):
+        ch = query[i]
+        if ch in "'\"":
+            value, i = _read_string(query, i)
+            name = f"{prefix}{len(params)}"
+            params[name] = value
+            out.append(f"${name}")
+        elif ch == "`":
+            end = query.index("`", i + 1) + 1
+            out.append(query[i:end])
+            i = end
+        elif query.startswith("//", i):
+            end = query.find("\n", i)
+            i = len(query) if end == -1 else end
+        elif query.startswith("/*", i):
+            end = query.find("*/", i + 2)
+            i = len(query) if end == -1 else end + 2
+        elif _starts_number(query, i):
+            match = _NUMBER.match(query, i)
+            literal = match.group()
+            if _in_range_literal(query, i, match.end()):
+                out.append(literal)
+            else:
+                if literal.lower().startswith("0x"):
+                    value = int(literal, 16)
+                elif any(c in literal for c in ".eE"):
+                    value = float(literal)
+                else:
+                    value = int(literal)
+                name = f"{prefix}{len(params)}"
+                params[name] = value
+                out.append(f"${name}")
+            i = match.end()
+        elif ch.isspace():
+            if out and out[-1] != " ":
+                out.append(" ")
+            i += 1
+        else:
+            out.append(ch)
+            i += 1
+    text = "".join(out).strip()
+    return ParameterizedQuery(text, params, fingerprint(text))
+
+
+def mask_nested(query):
+    """Blank out bracketed text, backtick identifiers and string literals, keeping positions.
+
+    Keyword searches on the result only see the query's top-level clauses.
+    """
+    out = []
+    depth = 0
+    quote = None
+    i = 0
+    while i < len(query):
+        ch = query[i]
+        if quote:
+            if ch == "\\" and quote != "`":
+                out.append("  ")
+                i += 2
+                continue
+            if ch == quote:
+                quote = None
+            out.append(" ")
+        elif ch in "`'\"":
+            quote = ch
+            out.append(" ")
+        elif ch in "([{":
+            depth += 1
+            out.append(" ")
+        elif ch in ")]}":
+            depth -= 1
+            out.append(" ")
+        else:
+            out.append(ch if depth == 0 else " ")
+        i += 1
+    return "".join(out)[:len(query)]
+
+
+def fingerprint(normalized_query):
+    """Short stable hash of an already parameterized query"""
+    return hashlib.sha1(normalized_query.encode("utf-8")).hexdigest()[:16]
+
+
+def query_fingerprint(query):
+    """Fingerprint of any query: identical for queries that differ only in literals"""
+    return parameterize(query).fingerprint
@@ -1,18 +1,492 @@
-from neo4j import GraphDatabase
+import os
+import re
+import time
+import atexit
+import threading
+from neo4j import AsyncGraphDatabase, GraphDatabase, READ_ACCESS, WRITE_ACCESS, unit_of_work
+from neo4j.exceptions import Neo4jError
+from core.batch import plan_batch, split_results
+from core.results import Rows, RowBudget, collect_rows
+from core.query_guard import QueryGuard
+from core.schema import SchemaManager
+from core.schema_cache import SchemaCache
+from core.result_cache import ResultCache, cache_key
+
+_WRITE_CLAUSE = re.compile(r"\b(CREATE|MERGE|DELETE|SET|REMOVE|DROP|FOREACH|LOAD\s+CSV)\b", re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+
+
+def is_write_query(query):
+    """True if the query contains a write clause (string literals are ignored)"""
+    return bool(_WRITE_CLAUSE.search(_STRING_LITERAL.sub("''", query)))
+
+
+def _env_number(name, default, cast=float):
+    value = os.getenv(name)
+    return cast(value) if value not in (None, "") else default
+
+
+def _collect(tx, query, params, max_rows=None, max_bytes=None):
+    result = tx.run(query, params or {})
+    rows = collect_rows((record.data() for record in result), max_rows, max_bytes)
+    # Tell the server to drop whatever a limit left unread
+    result.consume()
+    return rows
+
+
+async def _acollect(tx, query, params, max_rows=None, max_bytes=None):
+    result = await tx.run(query, params or {})
+    budget = RowBudget(max_rows, max_bytes)
+    rows = []
+    async for record in result:
+        row = record.data()
+        if not budget.admit(row):
+            break
+        rows.append(row)
+    await result.consume()
+    return Rows(rows, budget.truncated)
+
+
+async def _acollect_many(tx, statements):
+    """``statements`` are ``(query, params)`` or ``(query, params, max_rows, max_bytes)``"""
+    return [await _acollect(tx, *statement) for statement in statements]
+
+
+def _driver_settings(max_pool_size=None, acquisition_timeout=None, max_retry_time=None):
+    return {
+        "max_connection_pool_size": max_pool_size or _env_number("NEO4J_MAX_POOL_SIZE", 50, int),
+        "connection_acquisition_timeout": acquisition_timeout or _env_number("NEO4J_ACQUISITION_TIMEOUT", 60.0),
+        "max_transaction_retry_time": max_retry_time or _env_number("NEO4J_MAX_RETRY_TIME", 15.0),
+    }
+
 
 class Neo4jConnector:
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
-    
-    def execute_query(self, query, params=None):
-        with self.driver.session() as session:
-            result = session.run(query)
-            return [record.data() for record in result]   
+    """Wraps one pooled driver.
+
+    Reads and writes go through managed transactions, so transient errors
+    (deadlocks, leader switches, dropped connections) are retried by the
+    driver for up to ``max_retry_time`` seconds. Settings not passed
+    explicitly are read from ``NEO4J_*`` environment variables.
+
+    Read results are cached (see core/result_cache.py) against the graph
+    version stored on the ``GraphMeta`` node. Every write made through this
+    connector bumps that version; other writers such as the populator bump it
+    themselves. The version is re-read at most every
+    ``NEO4J_VERSION_CHECK_INTERVAL`` seconds.
+    """
+
+    def __init__(self, uri, user, password, database=None, max_pool_size=None,
+                 acquisition_timeout=None, query_timeout=None, max_retry_time=None):
+        self.database = database or os.getenv("NEO4J_DATABASE") or None
+        self.query_timeout = query_timeout if query_timeout is not None else _env_number("NEO4J_QUERY_TIMEOUT", 30.0)
+        self.driver = GraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            **_driver_settings(max_pool_size, acquisition_timeout, max_retry_time),
+        )
+        self._schema_cache = None
+        self._guard = None
+        self.result_cache = ResultCache() if os.getenv("RESULT_CACHE_ENABLED", "1") != "0" else None
+        self.version_check_interval = _env_number("NEO4J_VERSION_CHECK_INTERVAL", 5.0)
+        self._graph_version = None
+        self._version_checked_at = 0.0
+
+    def session(self, **kwargs):
+        return self.driver.session(database=self.database, **kwargs)
+
+    def _work(self, timeout):
+        timeout = self.query_timeout if timeout is None else timeout
+        return unit_of_work(timeout=timeout or None)(_collect)
+
+    def execute_read(self, query, params=None, timeout=None, max_rows=None, max_bytes=None):
+        with self.session(default_access_mode=READ_ACCESS) as session:
+            return session.execute_read(self._work(timeout), query, params, max_rows, max_bytes)
+
+    def explain(self, query, params=None):
+        """EXPLAIN plan of ``query`` (a dict of operators), without running it"""
+        def work(tx):
+            return tx.run("EXPLAIN " + query, params or {}).consume().plan
+
+        with self.session(default_access_mode=READ_ACCESS) as session:
+            return session.execute_read(work)
+
+    def stream(self, query, params=None, page_size=100, timeout=None):
+        """Yield result rows in pages of ``page_size`` without holding the whole result.
+
+        Uses an explicit read transaction; stop iterating (or close the
+        generator) to abandon the rest of the result.
+        """
+        timeout = self.query_timeout if timeout is None else timeout
+        with self.session(default_access_mode=READ_ACCESS, fetch_size=page_size) as session:
+            with session.begin_transaction(timeout=timeout or None) as tx:
+                page = []
+                for record in tx.run(query, params or {}):
+                    page.append(record.data())
+                    if len(page) == page_size:
+                        yield page
+                        page = []
+                if page:
+                    yield page
+
+    def execute_write(self, query, params=None, timeout=None):
+        with self.session(default_access_mode=WRITE_ACCESS) as session:
+            records = session.execute_write(self._work(timeout), query, params)
+        self.bump_graph_version()
+        return records
+
+    def execute_query(self, query, params=None, timeout=None, cache_ttl=None, use_cache=True,
+                      max_rows=None, max_bytes=None):
+        """Run a query, routing it to a read or write transaction.
+
+        Reads are served from the result cache when possible; writes always bypass it.
+        Reads stop after ``max_rows`` rows or ``max_bytes`` of JSON and come back
+        as Rows with ``truncated`` set.
+        """
+        if is_write_query(query):
+            if self.result_cache is not None:
+                self.result_cache.record_bypass()
+            return self.execute_write(query, params, timeout)
+        if self.result_cache is None or not use_cache:
+            return self.execute_read(query, params, timeout, max_rows, max_bytes)
+
+        version = self.current_graph_version()
+        key = cache_key(query, params, (max_rows, max_bytes))
+        records = self.result_cache.get(key, version)
+        if records is None:
+            records = self.execute_read(query, params, timeout, max_rows, max_bytes)
+            self.result_cache.put(key, records, version, ttl=cache_ttl)
+        return records
+
     def get_schema(self):
-        with self.driver.session() as session:
-            result = session.run("CALL db.schema.visualization()")
-            data = result.single()
-            return data["nodes"], data["relationships"]   
-    
-    def clear_database(self):
-        self.execute_query("MATCH (n) DETACH DELETE n")
+        def work(tx):
+            data = tx.run("CALL db.schema.visualization()").single()
+            return data["nodes"], data["relationships"]
+
+        with self.session(default_access_mode=READ_ACCESS) as session:
+            return session.execute_read(work)
+
+    def get_node_properties(self):
+        """(label, property) pairs present in the graph"""
+        records = self.execute_read("""
+            CALL db.schema.nodeTypeProperties() YIELD nodeLabels, propertyName
+            RETURN nodeLabels, propertyName
+        """)
+        return [
+            (label, record["propertyName"])
+            for record in records
+            if record["propertyName"]
+            for label in record["nodeLabels"]
+        ]
+
+    def get_schema_version(self):
+        records = self.execute_read(
+            "MATCH (m:GraphMeta {key: 'graph'}) RETURN m.schema_version AS version"
+        )
+        return records[0]["version"] if records else 0
+
+    def _bump_meta(self, field):
+        with self.session(default_access_mode=WRITE_ACCESS) as session:
+            records = session.execute_write(self._work(None), f"""
+                MERGE (m:GraphMeta {{key: 'graph'}})
+                SET m.{field} = coalesce(m.{field}, 0) + 1
+                RETURN m.{field} AS version
+            """, None)
+        return records[0]["version"]
+
+    def bump_schema_version(self):
+        """Mark the schema as changed so every SchemaCache reloads it"""
+        version = self._bump_meta("schema_version")
+        if self._schema_cache is not None:
+            self._schema_cache.invalidate()
+        return version
+
+    def get_graph_version(self):
+        records = self.execute_read(
+            "MATCH (m:GraphMeta {key: 'graph'}) RETURN m.data_version AS version"
+        )
+        return (records[0]["version"] or 0) if records else 0
+
+    def bump_graph_version(self):
+        """Mark the data as changed so cached results from any process are dropped"""
+        self._graph_version = self._bump_meta("data_version")
+        self._version_checked_at = time.monotonic()
+        return self._graph_version
+
+    def current_graph_version(self):
+        now = time.monotonic()
+        if self._graph_version is None or now - self._version_checked_at >= self.version_check_interval:
+            self._graph_version = self.get_graph_version()
+            self._version_checked_at = now
+        return self._graph_version
+
+    @property
+    def schema_cache(self):
+        """Process-local cache of the schema and its prompt rendering"""
+        if self._schema_cache is None:
+            self._schema_cache = SchemaCache(self)
+        return self._schema_cache
+
+    @property
+    def guard(self):
+        """EXPLAIN-based pre-flight check for generated queries; None if QUERY_GUARD_ENABLED=0"""
+        if self._guard is None and os.getenv("QUERY_GUARD_ENABLED", "1") != "0":
+            self._guard = QueryGuard(self)
+        return self._guard
+
+    @property
+    def schema(self):
+        """Constraint/index bootstrap and index advisor for this database"""
+        return SchemaManager(self)
+
+    def clear_database(self, batch_size=10000):
+        # Keep the bookkeeping nodes: constraints outlive a clear, and resetting the
+        # version counter would let caches mistake the reloaded graph for the old one.
+        # Deleting in bounded transactions keeps a large graph from exhausting transaction memory.
+        while True:
+            with self.session(default_access_mode=WRITE_ACCESS) as session:
+                records = session.execute_write(self._work(None), """
+                    MATCH (n) WHERE NOT n:GraphMeta AND NOT n:SchemaMigration
+                    WITH n LIMIT $limit
+                    DETACH DELETE n
+                    RETURN count(*) AS deleted
+                """, {"limit": batch_size})
+            if not records[0]["deleted"]:
+                break
+        self.bump_graph_version()
+
+    def close(self):
+        self.driver.close()
+
+
+class AsyncNeo4jConnector:
+    """asyncio counterpart of Neo4jConnector for the web API's request path.
+
+    Configured from the same ``NEO4J_*`` variables. It shares the result cache
+    of the process-wide sync connector, so both paths see the same entries.
+    """
+
+    def __init__(self, uri, user, password, database=None, max_pool_size=None,
+                 acquisition_timeout=None, query_timeout=None, max_retry_time=None, result_cache=None):
+        self.database = database or os.getenv("NEO4J_DATABASE") or None
+        self.query_timeout = query_timeout if query_timeout is not None else _env_number("NEO4J_QUERY_TIMEOUT", 30.0)
+        self.driver = AsyncGraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            **_driver_settings(max_pool_size, acquisition_timeout, max_retry_time),
+        )
+        self.result_cache = result_cache
+        self.version_check_interval = _env_number("NEO4J_VERSION_CHECK_INTERVAL", 5.0)
+        self._graph_version = None
+        self._version_checked_at = 0.0
+
+    def session(self, **kwargs):
+        return self.driver.session(database=self.database, **kwargs)
+
+    def _work(self, timeout):
+        timeout = self.query_timeout if timeout is None else timeout
+        return unit_of_work(timeout=timeout or None)(_acollect)
+
+    async def execute_read(self, query, params=None, timeout=None, max_rows=None, max_bytes=None):
+        async with self.session(default_access_mode=READ_ACCESS) as session:
+            return await session.execute_read(self._work(timeout), query, params, max_rows, max_bytes)
+
+    async def execute_write(self, query, params=None, timeout=None):
+        async with self.session(default_access_mode=WRITE_ACCESS) as session:
+            records = await session.execute_write(self._work(timeout), query, params)
+            bumped = await session.execute_write(self._work(None), """
+                MERGE (m:GraphMeta {key: 'graph'})
+                SET m.data_version = coalesce(m.data_version, 0) + 1
+                RETURN m.data_version AS version
+            """, None)
+        self._graph_version = bumped[0]["version"]
+        self._version_checked_at = time.monotonic()
+        return records
+
+    async def explain(self, query, params=None):
+        async def work(tx):
+            result = await tx.run("EXPLAIN " + query, params or {})
+            return (await result.consume()).plan
+
+        async with self.session(default_access_mode=READ_ACCESS) as session:
+            return await session.execute_read(work)
+
+    async def execute_read_many(self, statements, timeout=None):
+        """Run statements (see _acollect_many) in one read transaction; one result list each"""
+        timeout = self.query_timeout if timeout is None else timeout
+        async with self.session(default_access_mode=READ_ACCESS) as session:
+            return await session.execute_read(unit_of_work(timeout=timeout or None)(_acollect_many), statements)
+
+    async def execute_batch(self, statements, timeout=None, max_rows=None, max_bytes=None):
+        """Run many ``(query, params)`` statements with as few round trips as possible.
+
+        Cached reads are reused, structurally identical reads are merged into one
+        ``UNWIND`` query each (see core/batch.py) and everything left runs in a
+        single read transaction. Writes run on their own. Returns one entry per
+        statement, in order: its rows (limited as in execute_query), or the
+        exception it raised.
+        """
+        limits = (max_rows, max_bytes)
+        results = [None] * len(statements)
+        version = await self.current_graph_version() if self.result_cache is not None else None
+        pending = []
+        for i, (query, params) in enumerate(statements):
+            if is_write_query(query):
+                try:
+                    results[i] = await self.execute_query(query, params, timeout)
+                except Neo4jError as e:
+                    results[i] = e
+                continue
+            if self.result_cache is not None:
+                results[i] = self.result_cache.get(cache_key(query, params, limits), version)
+            if results[i] is None:
+                pending.append(i)
+        if not pending:
+            return results
+
+        # Each merged statement returns at most one row past its own limit, and
+        # the group gets their combined allowance; statements are trimmed to
+        # their own limits after splitting
+        per_statement = None if max_rows is None else max_rows + 1
+        groups = plan_batch([statements[i] for i in pending], pending, per_statement)
+        work = [
+            (g.query, g.params, *(None if limit is None else (limit + 1) * len(g.indices) for limit in limits))
+            for g in groups
+        ]
+        try:
+            executed = await self.execute_read_many(work, timeout)
+        except Neo4jError:
+            # One bad query aborts the shared transaction, so isolate it
+            executed = []
+            for statement in work:
+                try:
+                    executed.append(await self.execute_read(statement[0], statement[1], timeout, *statement[2:]))
+                except Neo4jError as e:
+                    executed.append(e)
+        for group, records in zip(groups, executed):
+            if isinstance(records, Exception):
+                for i in group.indices:
+                    results[i] = records
+                continue
+            for i, rows in split_results(group, records).items():
+                trimmed = collect_rows(rows, max_rows, max_bytes)
+                if group.columns is None:
+                    trimmed.truncated = trimmed.truncated or records.truncated
+                elif records.truncated and not trimmed.truncated:
+                    # The group ran out of bytes, possibly before this statement's
+                    # rows were all read, so it runs again on its own
+                    try:
+                        trimmed = await self.execute_read(*statements[i], timeout, max_rows, max_bytes)
+                    except Neo4jError as e:
+                        results[i] = e
+                        continue
+                results[i] = trimmed
+                if self.result_cache is not None:
+                    self.result_cache.put(cache_key(*statements[i], limits), trimmed, version)
+        return results
+
+    async def stream(self, query, params=None, page_size=100, timeout=None):
+        """Yield result rows in pages of ``page_size`` as Neo4j produces them.
+
+        Uses an explicit read transaction: rows already handed to the caller
+        cannot be replayed, so unlike execute_read this is not retried.
+        """
+        timeout = self.query_timeout if timeout is None else timeout
+        async with self.session(default_access_mode=READ_ACCESS, fetch_size=page_size) as session:
+            async with await session.begin_transaction(timeout=timeout or None) as tx:
+                result = await tx.run(query, params or {})
+                page = []
+                async for record in result:
+                    page.append(record.data())
+                    if len(page) == page_size:
+                        yield page
+                        page = []
+                if page:
+                    yield page
+
+    async def current_graph_version(self):
+        now = time.monotonic()
+        if self._graph_version is None or now - self._version_checked_at >= self.version_check_interval:
+            records = await self.execute_read(
+                "MATCH (m:GraphMeta {key: 'graph'}) RETURN m.data_version AS version"
+            )
+            self._graph_version = (records[0]["version"] or 0) if records else 0
+            self._version_checked_at = now
+        return self._graph_version
+
+    async def execute_query(self, query, params=None, timeout=None, cache_ttl=None, use_cache=True,
+                            max_rows=None, max_bytes=None):
+        """Same routing, caching and limit rules as Neo4jConnector.execute_query"""
+        if is_write_query(query):
+            if self.result_cache is not None:
+                self.result_cache.record_bypass()
+            return await self.execute_write(query, params, timeout)
+        if self.result_cache is None or not use_cache:
+            return await self.execute_read(query, params, timeout, max_rows, max_bytes)
+
+        version = await self.current_graph_version()
+        key = cache_key(query, params, (max_rows, max_bytes))
+        records = self.result_cache.get(key, version)
+        if records is None:
+            records = await self.execute_read(query, params, timeout, max_rows, max_bytes)
+            self.result_cache.put(key, records, version, ttl=cache_ttl)
+        return records
+
+    async def close(self):
+        await self.driver.close()
+
+
+_connectors = {}
+_async_connectors = {}
+_connectors_lock = threading.Lock()
+
+
+def _resolve(uri, user, password, settings):
+    uri = uri or os.getenv("NEO4J_URI", "bolt://localhost:7687")
+    user = user or os.getenv("NEO4J_USER", "neo4j")
+    password = password or os.getenv("NEO4J_PASSWORD", "yourpassword")
+    return uri, user, password, (uri, user, settings.get("database") or os.getenv("NEO4J_DATABASE"))
+
+
+def get_connector(uri=None, user=None, password=None, **settings):
+    """Return the process-wide connector for ``uri``/``user``, creating it on first use.
+
+    Arguments default to ``NEO4J_URI``, ``NEO4J_USER`` and ``NEO4J_PASSWORD``.
+    """
+    uri, user, password, key = _resolve(uri, user, password, settings)
+    with _connectors_lock:
+        if key not in _connectors:
+            _connectors[key] = Neo4jConnector(uri, user, password, **settings)
+        return _connectors[key]
+
+
+def get_async_connector(uri=None, user=None, password=None, **settings):
+    """Process-wide AsyncNeo4jConnector; same arguments and defaults as get_connector"""
+    sync_connector = get_connector(uri, user, password, **settings)
+    uri, user, password, key = _resolve(uri, user, password, settings)
+    with _connectors_lock:
+        if key not in _async_connectors:
+            _async_connectors[key] = AsyncNeo4jConnector(
+                uri, user, password, result_cache=sync_connector.result_cache, **settings
+            )
+        return _async_connectors[key]
+
+
+async def aclose_all():
+    """Close every shared async driver; call from the event loop that used them"""
+    with _connectors_lock:
+        connectors = list(_async_connectors.values())
+        _async_connectors.clear()
+    for connector in connectors:
+        await connector.close()
+
+
+def close_all():
+    """Close every shared driver; safe to call more than once"""
+    with _connectors_lock:
+        connectors = list(_connectors.values())
+        _connectors.clear()
+    for connector in connectors:
+        connector.close()
+
+
+atexit.register(close_all)
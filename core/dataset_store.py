@@ -0,0 +1,139 @@
+# core/dataset_store.py
+import os
+import ast
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+SCHEMA = pa.schema([
+    ("question_id", pa.int64()),
+    ("question", pa.string()),
+    ("cypher", pa.string()),
+    ("expected_output", pa.string()),  # canonical JSON of the result rows
+    ("expected_rows", pa.int32()),
+])
+SPLITS = ("train", "test")
+
+
+def canonical_json(value):
+    """Stable JSON text for a result: sorted keys, non-JSON values (dates, points) as strings"""
+    return json.dumps(value, sort_keys=True, default=str, ensure_ascii=False)
+
+
+def canonical_result(value):
+    """A result as plain JSON values, the form expected outputs are stored in"""
+    return json.loads(canonical_json(value))
+
+
+def parse_expected(text):
+    """Parse an expected output cell: canonical JSON, or the repr() older CSVs were written with"""
+    if not isinstance(text, str):
+        return canonical_result(text)
+    for parse in (json.loads, ast.literal_eval):
+        try:
+            return canonical_result(parse(text))
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            continue
+    return text  # unparseable (e.g. a repr of driver objects); compares unequal to any result
+
+
+class DatasetStore:
+    """Evaluation set as one Arrow IPC file plus train/test index arrays.
+
+    ``dataset.arrow`` holds question_id, question, cypher and the expected
+    result as canonical JSON, parsed once when the store is written. It is
+    memory-mapped on first use, so opening the store costs the same at 40
+    rows or 40,000, and each bot process shares the OS page cache instead of
+    re-reading CSVs. Splits are ``<split>.npy`` arrays of row positions,
+    also memory-mapped; re-splitting never copies the data.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.getenv("EVAL_STORE_DIR", "data/eval_store")
+        self.dataset_path = os.path.join(self.directory, "dataset.arrow")
+        self._table = None
+
+    def exists(self):
+        return os.path.exists(self.dataset_path)
+
+    def split_path(self, name):
+        return os.path.join(self.directory, f"{name}.npy")
+
+    def has_splits(self):
+        return all(os.path.exists(self.split_path(name)) for name in SPLITS)
+
+    @property
+    def table(self):
+        if self._table is None:
+            # Zero-copy: column buffers point straight into the mapped file
+            self._table = pa.ipc.open_file(pa.memory_map(self.dataset_path, "r")).read_all()
+        return self._table
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def write(self, rows):
+        """Replace the dataset with ``rows`` (dicts with question, cypher, expected_output)"""
+        questions, cyphers, outputs, counts = [], [], [], []
+        for row in rows:
+            result = parse_expected(row["expected_output"])
+            questions.append(row["question"])
+            cyphers.append(row["cypher"])
+            outputs.append(canonical_json(result))
+            counts.append(len(result) if isinstance(result, list) else 0)
+        table = pa.Table.from_pydict({
+            "question_id": list(range(len(questions))),
+            "question": questions,
+            "cypher": cyphers,
+            "expected_output": outputs,
+            "expected_rows": counts,
+        }, schema=SCHEMA)
+
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.dataset_path + ".tmp"
+        with pa.OSFile(tmp, "wb") as sink:
+            with pa.ipc.new_file(sink, SCHEMA) as writer:
+                writer.write_table(table)
+        os.replace(tmp, self.dataset_path)
+        self._table = None
+        for name in SPLITS:  # positions into the old data mean nothing now
+            if os.path.exists(self.split_path(name)):
+                os.remove(self.split_path(name))
+        return table.num_rows
+
+    def import_csv(self, path):
+        """Build the store from a question/cypher/expected_output CSV"""
+        return self.write(pd.read_csv(path).to_dict("records"))
+
+    def write_split(self, name, positions):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.split_path(name) + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.asarray(positions, dtype=np.int64))
+        os.replace(tmp, self.split_path(name))
+
+    def split(self, test_size=0.2, seed=None):
+        """Shuffle row positions into train/test index arrays"""
+        positions = np.random.default_rng(seed).permutation(len(self))
+        n_test = int(np.ceil(len(positions) * test_size))
+        self.write_split("test", np.sort(positions[:n_test]))
+        self.write_split("train", np.sort(positions[n_test:]))
+
+    def positions(self, name):
+        return np.load(self.split_path(name), mmap_mode="r")
+
+    def frame(self, positions=None, parse=True):
+        """Rows at ``positions`` (all rows if None) as a DataFrame.
+
+        With ``parse`` the ``expected_result`` column holds the decoded result
+        rows; only the selected rows are decoded.
+        """
+        table = self.table if positions is None else self.table.take(pa.array(np.asarray(positions), pa.int64()))
+        df = table.to_pandas()
+        if parse:
+            df["expected_result"] = [json.loads(text) for text in df["expected_output"]]
+        return df
+
+    def get_split(self, name, parse=True):
+        return self.frame(self.positions(name), parse=parse)
@@ -0,0 +1,246 @@
+# core/embeddings.py
+import os
+import re
+import zlib
+import time
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optional: fall back to hashed n-grams
+    SentenceTransformer = None
+
+try:
+    from langchain.embeddings import OpenAIEmbeddings
+except ImportError:  # only needed for EMBEDDING_PROVIDER=openai
+    OpenAIEmbeddings = None
+
+logger = logging.getLogger(__name__)
+_TOKEN = re.compile(r"\w+")
+STORAGE_TYPES = ("float32", "float16", "int8")
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class LocalEmbeddings:
+    """sentence-transformers model run in-process; vectors are L2-normalized float32"""
+
+    def __init__(self, model_name=None, batch_size=64):
+        self.model_name = model_name or os.getenv("LOCAL_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(self.model_name)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def embed_documents(self, texts):
+        vectors = self.model.encode(
+            list(texts), batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return vectors.astype(np.float32)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class HashingEmbeddings:
+    """Dependency-free fallback: hashed word and character-trigram counts"""
+
+    def __init__(self, dimension=512):
+        self.model_name = f"hashing-{dimension}"
+        self.dimension = dimension
+
+    def _features(self, text):
+        text = text.lower()
+        words = _TOKEN.findall(text)
+        grams = [w[i:i + 3] for w in (f" {w} " for w in words) for i in range(len(w) - 2)]
+        return words + grams
+
+    def embed_documents(self, texts):
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                vectors[row, zlib.crc32(feature.encode("utf-8")) % self.dimension] += 1.0
+        return _normalize(vectors)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class OpenAIEmbeddingBackend:
+    """OpenAI embeddings API, normalized to float32 like the local backends"""
+
+    def __init__(self, model_name=None):
+        if OpenAIEmbeddings is None:
+            raise ImportError("EMBEDDING_PROVIDER=openai needs langchain installed")
+        self.model_name = model_name or os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+        self.client = OpenAIEmbeddings(model=self.model_name)
+        self._dimension = None
+
+    @property
+    def dimension(self):
+        if self._dimension is None:
+            self._dimension = len(self.client.embed_query("dimension"))
+        return self._dimension
+
+    def embed_documents(self, texts):
+        vectors = np.asarray(self.client.embed_documents(list(texts)), dtype=np.float32)
+        self._dimension = vectors.shape[1] if len(vectors) else self._dimension
+        return _normalize(vectors)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class BatchingEmbeddings:
+    """Front for an embedding backend shared by every caller in the process.
+
+    ``embed_query`` answers repeated texts from an LRU cache. Misses from
+    concurrent threads are queued and embedded together: a background worker
+    takes up to ``max_batch`` texts, waiting at most ``max_wait`` seconds for
+    the batch to fill, so one backend call serves many in-flight requests.
+    ``embed_documents`` passes whole corpora straight to the backend, which
+    batches them itself.
+    """
+
+    def __init__(self, backend, max_batch=None, max_wait_ms=None, cache_size=None):
+        self.backend = backend
+        self.model_name = backend.model_name
+        self.max_batch = int(max_batch or os.getenv("EMBEDDING_MAX_BATCH", 64))
+        self.max_wait = float(max_wait_ms or os.getenv("EMBEDDING_MAX_WAIT_MS", 5)) / 1000
+        self.cache_size = int(cache_size or os.getenv("EMBEDDING_CACHE_SIZE", 4096))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self.hits = 0
+        self.misses = 0
+        self.backend_calls = 0
+        self.batched_texts = 0
+
+    @property
+    def dimension(self):
+        return self.backend.dimension
+
+    def embed_documents(self, texts):
+        return self.backend.embed_documents(list(texts))
+
+    def embed_query(self, text):
+        with self._lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+                self.hits += 1
+                return vector
+            self.misses += 1
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+        future = Future()
+        self._queue.put((text, future))
+        vector = future.result()
+        with self._lock:
+            self._cache[text] = vector
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vector
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = self.backend.embed_documents(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            with self._lock:
+                self.backend_calls += 1
+                self.batched_texts += len(texts)
+            by_text = {}
+            for text, vector in zip(texts, vectors):
+                # Copy out of the batch matrix and freeze, since cached vectors are shared
+                by_text[text] = np.array(vector, dtype=np.float32)
+                by_text[text].setflags(write=False)
+            for text, future in batch:
+                future.set_result(by_text[text])
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "cached_queries": len(self._cache),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "backend_calls": self.backend_calls,
+            "avg_batch_size": self.batched_texts / self.backend_calls if self.backend_calls else 0.0,
+        }
+
+
+def embedding_storage(storage=None):
+    """How stored vectors are kept: float32, float16 or int8 (``EMBEDDING_STORAGE``)"""
+    storage = storage or os.getenv("EMBEDDING_STORAGE", "float32")
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"EMBEDDING_STORAGE must be one of {', '.join(STORAGE_TYPES)}, got {storage!r}")
+    return storage
+
+
+def encode_vectors(vectors, storage):
+    """Store normalized float vectors compactly; int8 keeps about two decimal places"""
+    if storage == "int8":
+        return np.clip(np.round(np.asarray(vectors) * 127), -127, 127).astype(np.int8)
+    return np.asarray(vectors, dtype=storage)
+
+
+def decode_vectors(vectors):
+    if vectors.dtype == np.int8:
+        return vectors.astype(np.float32) / 127
+    return vectors.astype(np.float32, copy=False)
+
+
+def get_local_embeddings():
+    """Local embedding backend that works offline"""
+    if SentenceTransformer is None:
+        reason = "sentence-transformers is not installed"
+    else:
+        try:
+            return LocalEmbeddings()
+        except OSError as e:
+            # Model weights not downloaded and no network access
+            reason = f"the sentence-transformers model could not be loaded ({e})"
+    logger.warning("Falling back to HashingEmbeddings because %s; similarity search will be much weaker", reason)
+    return HashingEmbeddings()
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_embeddings(provider=None):
+    """Process-wide BatchingEmbeddings for ``provider`` (``EMBEDDING_PROVIDER``: local or openai)"""
+    provider = provider or os.getenv("EMBEDDING_PROVIDER", "local")
+    with _shared_lock:
+        if provider not in _shared:
+            if provider == "local":
+                backend = get_local_embeddings()
+            elif provider == "openai":
+                backend = OpenAIEmbeddingBackend()
+            else:
+                raise ValueError(f"Unknown EMBEDDING_PROVIDER {provider!r}; use 'local' or 'openai'")
+            _shared[provider] = BatchingEmbeddings(backend)
+        return _shared[provider]
@@ -0,0 +1,98 @@
+# core/entities.py
+import re
+import threading
+from datetime import datetime
+
+_ISO_DATE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+_LONG_DATE = re.compile(
+    r"\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}\b",
+    re.IGNORECASE,
+)
+_TRACKING_NUMBER = re.compile(r"\b\d{3,}\b")
+
+VOCABULARY_QUERIES = {
+    "courier": "MATCH (n:Courier) RETURN n.name AS name",
+    "location": "MATCH (n:Location) RETURN n.name AS name",
+    "customer": "MATCH (n:Customer) RETURN n.name AS name",
+}
+
+
+def _parse_long_date(text):
+    cleaned = re.sub(r"(\d)(st|nd|rd|th)", r"\1", text.replace(",", " ").replace(".", " "))
+    cleaned = " ".join(cleaned.split())
+    for fmt in ("%B %d %Y", "%b %d %Y"):
+        try:
+            return datetime.strptime(cleaned, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+class EntityExtractor:
+    """Finds dates, tracking numbers and known courier/location/customer names in a question.
+
+    ``extract`` returns the question with every entity replaced by a ``<slot>``
+    marker, plus the ``(slot, value)`` pairs in order of appearance. Values are
+    canonical: ISO dates and the names exactly as stored in the graph.
+    """
+
+    def __init__(self, connector=None):
+        self.connector = connector
+        self._names = {}
+        self._pattern = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def set_vocabulary(self, names_by_slot):
+        names = [
+            (name.lower(), slot, name)
+            for slot, values in names_by_slot.items()
+            for name in values
+            if name
+        ]
+        # Longest first so "New York City" wins over "New York"
+        names.sort(key=lambda item: -len(item[0]))
+        self._names = {lowered: (slot, name) for lowered, slot, name in names}
+        self._pattern = re.compile(
+            r"\b(" + "|".join(re.escape(lowered) for lowered, _, _ in names) + r")\b", re.IGNORECASE
+        ) if names else None
+
+    def refresh(self):
+        """Reload names from the graph when its data version changed"""
+        if self.connector is None:
+            return
+        with self._lock:
+            version = self.connector.current_graph_version()
+            if version == self._version:
+                return
+            self.set_vocabulary({
+                slot: [record["name"] for record in self.connector.execute_query(query)]
+                for slot, query in VOCABULARY_QUERIES.items()
+            })
+            self._version = version
+
+    def extract(self, question):
+        self.refresh()
+        found = []
+
+        def mark(slot, value):
+            def replace(match):
+                found.append((match.start(), match.end(), slot, value(match)))
+                return "\x00" * len(match.group())
+            return replace
+
+        text = _ISO_DATE.sub(mark("date", lambda m: m.group()), question)
+        text = _LONG_DATE.sub(mark("date", lambda m: _parse_long_date(m.group()) or m.group()), text)
+        text = _TRACKING_NUMBER.sub(mark("tracking_number", lambda m: m.group()), text)
+        if self._pattern is not None:
+            self._pattern.sub(mark("name", lambda m: self._names[m.group().lower()][1]), text)
+        found = [
+            (start, end, self._names[value.lower()][0] if slot == "name" else slot, value)
+            for start, end, slot, value in found
+        ]
+
+        found.sort()
+        masked = question
+        for start, end, slot, _ in reversed(found):
+            masked = masked[:start] + f"<{slot}>" + masked[end:]
+        return masked, [(slot, value) for _, _, slot, value in found]
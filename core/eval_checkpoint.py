@@ -0,0 +1,74 @@
+# core/eval_checkpoint.py
+import os
+import json
+import hashlib
+import threading
+
+
+def row_key(row, bot_fingerprint, judge=None):
+    """Content hash of everything that decides a row's score"""
+    payload = {
+        "question": row["question"],
+        "expected_cypher": row["cypher"],
+        "expected_output": row["expected_output"],
+        "bot": bot_fingerprint,
+        "judge": judge,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class EvalCheckpoint:
+    """Append-only JSONL of scored rows keyed by row_key.
+
+    Each row is written (and fsynced) as soon as it is scored, so a crash or
+    Ctrl-C loses at most the rows in flight. A later run reuses every row whose
+    key is unchanged and only scores the rest.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._results = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        damaged = False
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    damaged = True  # a line cut short by a crash
+                    continue
+                if not line.endswith("\n"):
+                    damaged = True
+                self._results[entry["key"]] = entry["result"]
+        if damaged:
+            self.compact(self._results)
+
+    def __len__(self):
+        return len(self._results)
+
+    def get(self, key):
+        return self._results.get(key)
+
+    def append(self, key, result):
+        line = json.dumps({"key": key, "result": result}, default=str)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._results[key] = result
+
+    def compact(self, keys):
+        """Rewrite the file with only the entries for ``keys``, dropping stale rows"""
+        with self._lock:
+            self._results = {key: self._results[key] for key in keys if key in self._results}
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                for key, result in self._results.items():
+                    f.write(json.dumps({"key": key, "result": result}, default=str) + "\n")
+            os.replace(tmp, self.path)
@@ -0,0 +1,172 @@
+# core/eval_runner.py
+import os
+import time
+import random
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+from core.evaluator import CypherEvaluator
+from core.eval_checkpoint import EvalCheckpoint, row_key
+from scripts.generate_dataset import DatasetManager
+
+# Transient failures from the OpenAI client (matched by name so no import is needed)
+_RETRYABLE_NAMES = {
+    "RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError",
+    "ServiceUnavailableError", "Timeout",
+}
+
+
+def is_retryable(error):
+    """True for errors worth retrying: rate limits, timeouts and dropped connections"""
+    if isinstance(error, (TransientError, ServiceUnavailable, SessionExpired, TimeoutError, ConnectionError)):
+        return True
+    return type(error).__name__ in _RETRYABLE_NAMES
+
+
+def retry_call(func, *args, retries=4, base_delay=1.0, max_delay=30.0):
+    """Call ``func``, retrying retryable errors with jittered exponential backoff"""
+    for attempt in range(retries + 1):
+        try:
+            return func(*args)
+        except Exception as e:
+            if attempt == retries or not is_retryable(e):
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+class StageStats:
+    """Counts and busy time per pipeline stage, for the timing report"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+
+    def record(self, stage, seconds, ok=True):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"done": 0, "failed": 0, "busy_seconds": 0.0})
+            entry["done" if ok else "failed"] += 1
+            entry["busy_seconds"] += seconds
+
+
+class EvalRunner:
+    """Runs generate -> execute -> judge for every test row concurrently.
+
+    Each stage has its own concurrency limit (``EVAL_GENERATION_WORKERS``,
+    ``EVAL_EXECUTION_WORKERS``, ``EVAL_JUDGE_WORKERS``), so a row can be judged
+    while later rows are still generating. LLM calls are paced by the shared
+    rate limiter in core/llm_cache.py (``LLM_CALLS_PER_MINUTE``). Transient
+    errors are retried with backoff. Results come back in test-set order
+    whatever order rows finish in.
+
+    With a checkpoint, rows whose content hash (see core/eval_checkpoint.py)
+    is already recorded are reused, and each newly scored row is recorded as
+    soon as it finishes.
+    """
+
+    def __init__(self, generation_workers=None, execution_workers=None, judge_workers=None, retries=None):
+        self.workers = {
+            "generate": int(generation_workers or os.getenv("EVAL_GENERATION_WORKERS", 8)),
+            "execute": int(execution_workers or os.getenv("EVAL_EXECUTION_WORKERS", 8)),
+            "judge": int(judge_workers or os.getenv("EVAL_JUDGE_WORKERS", 4)),
+        }
+        self.retries = int(retries if retries is not None else os.getenv("EVAL_RETRIES", 4))
+        self._slots = {stage: threading.BoundedSemaphore(n) for stage, n in self.workers.items()}
+        self.stats = StageStats()
+        self.wall_seconds = 0.0
+        self.reused = 0
+
+    def _stage(self, stage, func, *args):
+        with self._slots[stage]:
+            start = time.perf_counter()
+            try:
+                result = retry_call(func, *args, retries=self.retries)
+            except Exception:
+                self.stats.record(stage, time.perf_counter() - start, ok=False)
+                raise
+            self.stats.record(stage, time.perf_counter() - start)
+            return result
+
+    def _run_row(self, bot, evaluator, row, key=None, checkpoint=None):
+        try:
+            cypher = self._stage("generate", bot.generate_cypher, row['question'])
+            # Uncapped, like the ground truth it is compared with
+            result = self._stage("execute", partial(bot.execute_cypher, limited=False), cypher)
+            scored = self._stage("judge", evaluator.evaluate_row, row, cypher, result)
+        except Exception as e:
+            print(f"Error processing {row['question']}: {str(e)}")
+            return None
+        if checkpoint is not None:
+            checkpoint.append(key, scored)
+        return scored
+
+    def run(self, bot, evaluator, test_df: pd.DataFrame, checkpoint=None) -> pd.DataFrame:
+        """Score ``bot`` on every row of ``test_df``; failed rows are reported and left out"""
+        self.stats = StageStats()
+        rows = [row for _, row in test_df.iterrows()]
+        fingerprint = bot.eval_fingerprint()
+        judge = evaluator.scoring_key()
+        keys = [row_key(row, fingerprint, judge) for row in rows]
+        start = time.perf_counter()
+        results = [checkpoint.get(key) if checkpoint is not None else None for key in keys]
+        self.reused = sum(result is not None for result in results)
+        pool = ThreadPoolExecutor(max_workers=sum(self.workers.values()), thread_name_prefix="eval")
+        try:
+            futures = {
+                i: pool.submit(self._run_row, bot, evaluator, row, keys[i], checkpoint)
+                for i, row in enumerate(rows) if results[i] is None
+            }
+            for i, future in futures.items():
+                results[i] = future.result()
+        except BaseException:
+            # Ctrl-C: stop queued rows; finished ones are already in the checkpoint
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown()
+        self.wall_seconds = time.perf_counter() - start
+        if checkpoint is not None:
+            checkpoint.compact(keys)
+        return pd.DataFrame([result for result in results if result is not None])
+
+    def timing_report(self):
+        lines = [f"⏱️ Wall clock: {self.wall_seconds:.1f}s ({self.reused} rows reused from the checkpoint)"]
+        for stage in self.workers:
+            entry = self.stats.stages.get(stage)
+            if not entry:
+                continue
+            throughput = entry["done"] / self.wall_seconds if self.wall_seconds else 0.0
+            lines.append(
+                f"   {stage}: {entry['done']} done, {entry['failed']} failed, "
+                f"{throughput:.2f} rows/s, {entry['busy_seconds']:.1f}s busy across {self.workers[stage]} workers"
+            )
+        return "\n".join(lines)
+
+
+def evaluate_bot(bot, results_path, bot_name, prepare=None, runner=None, resume=True):
+    """Shared evaluate() for the bots: run, save results, print and record the summary.
+
+    ``prepare`` is called with the training split before scoring (RagBot builds
+    its example index there). Scored rows are checkpointed next to
+    ``results_path``; pass ``resume=False`` to score everything again.
+    """
+    train_df, test_df = DatasetManager().get_dataset()
+    if prepare is not None:
+        prepare(train_df)
+    bot.evaluator = CypherEvaluator(test_df)
+    runner = runner or EvalRunner()
+    checkpoint_path = os.path.splitext(results_path)[0] + ".checkpoint.jsonl"
+    if not resume and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    try:
+        eval_df = runner.run(bot, bot.evaluator, test_df, checkpoint=EvalCheckpoint(checkpoint_path))
+    finally:
+        bot.evaluator.close()
+    eval_df.to_csv(results_path, index=False)
+
+    report = bot.evaluator.generate_report(eval_df)
+    print(f"\n📊 {bot_name} Evaluation Summary:")
+    bot.write_evaluation_summary(report, bot_name)
+    print(runner.timing_report())
+    return eval_df
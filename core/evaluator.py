@@ -1,57 +1,195 @@
 # File: evaluation/core/evaluator.py
+import os
+import json
+import asyncio
+import hashlib
+import threading
+from collections import defaultdict, deque
 import pandas as pd
 from deepeval.metrics import AnswerRelevancyMetric, GEval
+from deepeval.models import DeepEvalBaseLLM, GPTModel
 from deepeval.test_case import LLMTestCase, LLMTestCaseParams
+from langchain.chat_models import ChatOpenAI
+from core.llm_cache import CachedChatModel, get_llm_cache
+from core.dataset_store import canonical_json
+from core.result_compare import compare
+from core.utils import run_blocking
 from typing import List, Dict, Any
-import ast
+
+class CachedJudgeModel(DeepEvalBaseLLM):
+    """deepeval judge backed by the shared LLM response cache, so re-scoring unchanged rows is free"""
+    def __init__(self, model=None, cache=None):
+        # DEEPEVAL_JUDGE_MODEL, else the model deepeval itself would judge with
+        model = model or os.getenv("DEEPEVAL_JUDGE_MODEL") or GPTModel().model_name
+        self.chat = CachedChatModel(ChatOpenAI(model=model, temperature=0), cache)
+        super().__init__(model)
+
+    def load_model(self):
+        return self.chat
+
+    # No ``schema`` argument: deepeval then parses the JSON out of the returned text
+    def generate(self, prompt: str) -> str:
+        return self.chat.invoke(prompt).content
+
+    async def a_generate(self, prompt: str) -> str:
+        return (await self.chat.ainvoke(prompt)).content
+
+    def get_model_name(self):
+        return self.model_name
+
+def judge_key(metric, model, test_case):
+    """Cache key for one judged case: the metric, the judge model and the case's three fields"""
+    payload = [metric, model, test_case.input, test_case.actual_output, test_case.expected_output]
+    return "judge:" + hashlib.sha256(canonical_json(payload).encode("utf-8")).hexdigest()
 
 class CypherEvaluator:
-    def __init__(self, test_df: str):
+    # column -> (metric, which test case it scores)
+    JUDGED = {
+        'cypher_relevancy_score': ('answer_relevancy', 'cypher'),
+        'cypher_correctness_score': ('correctness', 'cypher'),
+        'answer_relevancy_score': ('answer_relevancy', 'answer'),
+        'answer_correctness_score': ('correctness', 'answer'),
+    }
+
+    def __init__(self, test_df: pd.DataFrame, judge_model=None, ignore_aliases=None, score_cache=None, judge_concurrency=None):
         self.test_df = test_df
-        self.metrics = {
-            'answer_relevancy': AnswerRelevancyMetric(),
-            'correctness': GEval(
-                name="Correctness",
-                criteria="Determine whether the actual output is factually correct based on the expected output.",
-                evaluation_steps=[
-                    "Check whether the facts in 'actual output' contradicts any facts in 'expected output'",
-                    "You should also heavily penalize omission of detail",
-                    "Vague language, or contradicting OPINIONS, are OK"
-                ],
-                evaluation_params=[LLMTestCaseParams.INPUT, LLMTestCaseParams.ACTUAL_OUTPUT, LLMTestCaseParams.EXPECTED_OUTPUT],
-            )
-        }
+        self.judge_model = judge_model or CachedJudgeModel()
+        if ignore_aliases is None:
+            ignore_aliases = os.getenv("EVAL_IGNORE_ALIASES", "0").lower() in ("1", "true", "yes")
+        self.ignore_aliases = ignore_aliases
+        self.score_cache = score_cache if score_cache is not None else get_llm_cache()
+        self.judge_concurrency = int(judge_concurrency or os.getenv("EVAL_JUDGE_CONCURRENCY", 8))
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._index_rows()
+
+    def _judge_loop(self):
+        """The evaluator's own event loop, on a daemon thread.
+
+        Every judge call runs here, whichever thread or loop asked for it, so
+        the judge's async client is only ever used from one loop.
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="judge-loop", daemon=True).start()
+            return self._loop
+
+    def _submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._judge_loop())
+
+    def close(self):
+        """Stop the judge loop; a later call starts a new one"""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+
+    def _index_rows(self):
+        """question_id -> row, plus question -> ids for results that only carry the question text"""
+        records = self.test_df.to_dict("records")
+        ids = self.test_df['question_id'] if 'question_id' in self.test_df else range(len(records))
+        self.rows = {}
+        self.ids_by_question = defaultdict(list)
+        for question_id, record in zip(ids, records):
+            record['question_id'] = question_id
+            self.rows[question_id] = record
+            self.ids_by_question[record['question']].append(question_id)
+
+    def row(self, question_id):
+        return self.rows[question_id]
+
+    def _new_metric(self, name):
+        # deepeval metrics keep per-call state, so every measurement gets its own instance
+        if name == 'answer_relevancy':
+            return AnswerRelevancyMetric(model=self.judge_model)
+        return GEval(
+            name="Correctness",
+            criteria="Determine whether the actual output is factually correct based on the expected output.",
+            evaluation_steps=[
+                "Check whether the facts in 'actual output' contradicts any facts in 'expected output'",
+                "You should also heavily penalize omission of detail",
+                "Vague language, or contradicting OPINIONS, are OK"
+            ],
+            evaluation_params=[LLMTestCaseParams.INPUT, LLMTestCaseParams.ACTUAL_OUTPUT, LLMTestCaseParams.EXPECTED_OUTPUT],
+            model=self.judge_model,
+        )
     
     def _normalize_cypher(self, query: str) -> str:
         return ' '.join(query.strip().lower().split())
     
-    def _compare_results(self, actual: Any, expected: Any) -> bool:
-        try:
-            if isinstance(actual, str):
-                actual = ast.literal_eval(actual)
-            if isinstance(expected, str):
-                expected = ast.literal_eval(expected)
-            return actual == expected
-        except:
-            return False
+    def scoring_key(self):
+        """Everything besides the row that decides a score, for checkpoint keys"""
+        return f"{getattr(self.judge_model, 'model_name', None)}|compare-v2|ignore_aliases={self.ignore_aliases}"
+
+    def _compare_results(self, actual: Any, expected: Any):
+        """Order-insensitive multiset comparison, see core/result_compare.py"""
+        return compare(actual, expected, self.ignore_aliases)
     def test_case(self, question, llm_output, expected_output):
         return LLMTestCase(
             input=question,
             actual_output=llm_output,
             expected_output=expected_output
         )
-    def _evaluate_single(self, row: pd.Series, llm_cypher: str, llm_answer: Any) -> Dict:
-        cypher_test_case = self.test_case(row['question'], llm_cypher, row['cypher'])
-        answer_test_case = self.test_case(row['question'], llm_answer, row['expected_output'])
+
+    async def _ajudge(self, cases):
+        """Scores for (metric, test case) pairs, measured concurrently.
+
+        Cached scores are reused and identical cases are measured once.
+        """
+        model = getattr(self.judge_model, 'model_name', None)
+        keys = [judge_key(metric, model, case) for metric, case in cases]
+        scores = {}
+        pending = {}
+        for key, (metric, case) in zip(keys, cases):
+            if key in scores or key in pending:
+                continue
+            cached = await run_blocking(self.score_cache.get, key) if self.score_cache is not None else None
+            if cached is not None:
+                scores[key] = json.loads(cached)
+            else:
+                pending[key] = (metric, case)
+
+        slots = asyncio.Semaphore(self.judge_concurrency)
+
+        async def measure(key, metric, case):
+            async with slots:
+                score = await self._new_metric(metric).a_measure(case)
+            if self.score_cache is not None:
+                await run_blocking(self.score_cache.put, key, json.dumps(score))
+            scores[key] = score
+
+        await asyncio.gather(*(measure(key, metric, case) for key, (metric, case) in pending.items()))
+        return [scores[key] for key in keys]
+
+    def _cases(self, row, llm_cypher, llm_answer):
+        test_cases = {
+            'cypher': self.test_case(row['question'], llm_cypher, row['cypher']),
+            'answer': self.test_case(row['question'], llm_answer, row['expected_output']),
+        }
+        return [(metric, test_cases[which]) for metric, which in self.JUDGED.values()]
+
+    def evaluate_row(self, row: pd.Series, llm_cypher: str, llm_answer: Any) -> Dict:
+        """Score one test row; safe to call from several threads at once"""
+        scores = self._submit(self._ajudge(self._cases(row, llm_cypher, llm_answer))).result()
+        return self._scored_row(row, llm_cypher, llm_answer, scores)
+
+    def _scored_row(self, row, llm_cypher, llm_answer, scores) -> Dict:
+        # The stored JSON text is hashed once per process, however often it is compared
+        execution = self._compare_results(llm_answer, row['expected_output'])
+        judged = dict(zip(self.JUDGED, scores))
         
         return {
+            'question_id': row.get('question_id'),
             'question': row['question'],
             'cypher_exact_match': self._normalize_cypher(llm_cypher) == self._normalize_cypher(row['cypher']),
-            'cypher_relevancy_score': self.metrics['answer_relevancy'].measure(cypher_test_case),
-            'cypher_correctness_score': self.metrics['correctness'].measure(cypher_test_case),
-            'execution_accuracy': self._compare_results(llm_answer, row['expected_output']),
-            'answer_relevancy_score': self.metrics['answer_relevancy'].measure(answer_test_case),
-            'answer_correctness_score': self.metrics['correctness'].measure(answer_test_case),
+            'cypher_relevancy_score': judged['cypher_relevancy_score'],
+            'cypher_correctness_score': judged['cypher_correctness_score'],
+            'execution_accuracy': execution.match,
+            'execution_precision': execution.precision,
+            'execution_recall': execution.recall,
+            'answer_relevancy_score': judged['answer_relevancy_score'],
+            'answer_correctness_score': judged['answer_correctness_score'],
             'generated_cypher': llm_cypher,
             'generated_answer': llm_answer,
             'expected_cypher': row['cypher'],
@@ -62,15 +200,36 @@ class CypherEvaluator:
         """
         bot_results should be list of dicts with:
         [{
+            'question_id': int,  # optional; matched by question text otherwise
             'question': str,
             'generated_cypher': str,
             'generated_answer': Any
         }]
+        All judge calls for the batch run concurrently. From async code use aevaluate().
         """
-        results = []
+        return self._submit(self._aevaluate(bot_results)).result()
+
+    async def aevaluate(self, bot_results: List[Dict]) -> pd.DataFrame:
+        """evaluate() for callers already running an event loop"""
+        return await asyncio.wrap_future(self._submit(self._aevaluate(bot_results)))
+
+    async def _aevaluate(self, bot_results):
+        unclaimed = {question: deque(ids) for question, ids in self.ids_by_question.items()}
+        rows = []
         for br in bot_results:
-            row = self.test_df[self.test_df['question'] == br['question']].iloc[0]
-            results.append(self._evaluate_single(row, br['generated_cypher'], br['generated_answer']))
+            if 'question_id' in br:
+                rows.append(self.rows[br['question_id']])
+            else:
+                # Duplicate questions are matched to their test rows in order
+                rows.append(self.rows[unclaimed[br['question']].popleft()])
+
+        cases = [self._cases(row, br['generated_cypher'], br['generated_answer']) for row, br in zip(rows, bot_results)]
+        scores = await self._ajudge([case for row_cases in cases for case in row_cases])
+        width = len(self.JUDGED)
+        results = [
+            self._scored_row(row, br['generated_cypher'], br['generated_answer'], scores[i * width:(i + 1) * width])
+            for i, (row, br) in enumerate(zip(rows, bot_results))
+        ]
         
         return pd.DataFrame(results)
     
@@ -79,5 +238,8 @@ class CypherEvaluator:
             'avg_cypher_relevancy_score': df['cypher_relevancy_score'].mean(),
             'avg_cypher_correctness_score': df['cypher_correctness_score'].mean(),
             'avg_answer_relevancy_score': df['answer_relevancy_score'].mean(),
-            'avg_answer_correctness_score': df['answer_correctness_score'].mean()
+            'avg_answer_correctness_score': df['answer_correctness_score'].mean(),
+            'execution_accuracy': df['execution_accuracy'].mean(),
+            'avg_execution_precision': df['execution_precision'].mean(),
+            'avg_execution_recall': df['execution_recall'].mean()
         }
@@ -0,0 +1,108 @@
+# core/example_index.py
+import os
+import re
+import json
+import hashlib
+import faiss
+import numpy as np
+from core.embeddings import embedding_storage
+
+
+def content_id(text):
+    """Stable positive int64 id derived from an example's text"""
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "big") & 0x7FFFFFFFFFFFFFFF
+
+
+class ExampleIndex:
+    """Persistent FAISS index of few-shot examples, searched by cosine similarity.
+
+    Ids are content hashes, so ``sync`` embeds only examples that are new or
+    changed and removes the ones that are gone. The index is saved under
+    ``directory/<embedding model>`` and memory-mapped on load where FAISS
+    supports it for the index type, falling back to a normal read. With
+    float16 or int8 storage the vectors are scalar-quantized inside FAISS.
+    """
+
+    def __init__(self, embeddings, directory=None, model_name=None, storage=None):
+        self.embeddings = embeddings
+        self.storage = embedding_storage(storage)
+        model = model_name or getattr(embeddings, "model_name", None) or getattr(embeddings, "model", "default")
+        if self.storage != "float32":
+            model = f"{model}-{self.storage}"
+        self.directory = os.path.join(
+            directory or os.getenv("RAG_INDEX_DIR", "data/rag_index"), re.sub(r"[^\w.-]", "_", str(model))
+        )
+        self.index_path = os.path.join(self.directory, "index.faiss")
+        self.texts_path = os.path.join(self.directory, "texts.json")
+        self.index = None
+        self.texts = {}  # id -> example text
+        self.embedded = 0  # examples embedded by the last sync
+        self._load()
+
+    def _read(self, mmap=True):
+        if mmap:
+            flags = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+            try:
+                return faiss.read_index(self.index_path, flags)
+            except RuntimeError:
+                pass  # this FAISS build cannot map the index type
+        return faiss.read_index(self.index_path)
+
+    def _new_index(self, dimension):
+        if self.storage == "float32":
+            return faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        quantizer = {"float16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit_uniform}
+        index = faiss.IndexScalarQuantizer(dimension, quantizer[self.storage], faiss.METRIC_INNER_PRODUCT)
+        # Normalized vectors lie in [-1, 1]; a fixed range keeps later additions comparable
+        index.train(np.vstack([-np.ones(dimension), np.ones(dimension)]).astype(np.float32))
+        return faiss.IndexIDMap2(index)
+
+    def _load(self):
+        if not (os.path.exists(self.index_path) and os.path.exists(self.texts_path)):
+            return
+        with open(self.texts_path) as f:
+            self.texts = {int(key): text for key, text in json.load(f).items()}
+        self.index = self._read()
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write then rename, so a crash never leaves a half-written index behind
+        faiss.write_index(self.index, self.index_path + ".tmp")
+        with open(self.texts_path + ".tmp", "w") as f:
+            json.dump({str(key): text for key, text in self.texts.items()}, f)
+        os.replace(self.index_path + ".tmp", self.index_path)
+        os.replace(self.texts_path + ".tmp", self.texts_path)
+
+    def sync(self, texts):
+        """Make the index hold exactly ``texts``; returns True if it had to change"""
+        wanted = {content_id(text): text for text in texts}
+        stale = [key for key in self.texts if key not in wanted]
+        new = [(key, text) for key, text in wanted.items() if key not in self.texts]
+        self.embedded = len(new)
+        if not stale and not new:
+            return False
+
+        if self.index is not None and os.path.exists(self.index_path):
+            self.index = self._read(mmap=False)  # a mapped index is read-only
+        if stale:
+            self.index.remove_ids(np.array(stale, dtype=np.int64))
+            for key in stale:
+                del self.texts[key]
+        if new:
+            vectors = np.asarray(self.embeddings.embed_documents([text for _, text in new]), dtype=np.float32)
+            faiss.normalize_L2(vectors)
+            if self.index is None:
+                self.index = self._new_index(vectors.shape[1])
+            self.index.add_with_ids(vectors, np.array([key for key, _ in new], dtype=np.int64))
+            self.texts.update(new)
+        self.save()
+        return True
+
+    def search(self, query, k=3):
+        """Texts of the ``k`` examples most similar to ``query``"""
+        if self.index is None or not self.texts:
+            return []
+        vector = np.asarray([self.embeddings.embed_query(query)], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        _, ids = self.index.search(vector, min(k, len(self.texts)))
+        return [self.texts[int(key)] for key in ids[0] if key != -1]
@@ -0,0 +1,233 @@
+# core/intent_router.py
+import os
+import re
+import math
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, NamedTuple, Optional
+
+SHIPMENT_DETAILS_QUERY = """MATCH (s:Shipment {tracking_number: $tracking_number})
+OPTIONAL MATCH (s)-[:DISPATCHED_FROM]->(d_loc:Location)
+OPTIONAL MATCH (s)-[:DELIVERED_TO]->(del_loc:Location)
+OPTIONAL MATCH (s)-[:ASSIGNED_TO]->(courier:Courier)
+OPTIONAL MATCH (s)-[:BELONGS_TO]->(cust:Customer)
+RETURN s.tracking_number AS tracking_number,
+       s.status AS status,
+       s.dispatch_date AS dispatch_date,
+       s.expected_delivery_date AS expected_delivery_date,
+       d_loc.name AS dispatch_location,
+       del_loc.name AS delivery_location,
+       courier.name AS courier,
+       cust.name AS customer"""
+
+# Templates mirror the example queries in bots/few_shot_bot.py
+TEMPLATES = {
+    "shipment_status":
+        "MATCH (s:Shipment {tracking_number: $tracking_number}) RETURN s.status AS status",
+    "dispatch_location":
+        "MATCH (s:Shipment {tracking_number: $tracking_number})-[:DISPATCHED_FROM]->(l:Location) "
+        "RETURN l.name AS dispatch_location",
+    "delivery_location":
+        "MATCH (s:Shipment {tracking_number: $tracking_number})-[:DELIVERED_TO]->(l:Location) "
+        "RETURN l.name AS delivery_location",
+    "courier_assignment":
+        "MATCH (s:Shipment {tracking_number: $tracking_number})-[:ASSIGNED_TO]->(c:Courier) "
+        "RETURN c.name AS courier",
+    "shipment_details": SHIPMENT_DETAILS_QUERY,
+}
+
+# Intents answered without touching the graph
+NO_QUERY_INTENTS = {"business_hours"}
+
+RULES = [
+    ("business_hours", re.compile(
+        r"\b(business|working|opening|office)\s+hours\b|\bwhen\s+(are|do)\s+you\s+(open|close)\b"
+        r"|\bare\s+you\s+open\b|\bwhat\s+time\s+do\s+you\s+(open|close)\b", re.I)),
+    ("dispatch_location", re.compile(r"\b(dispatched|shipped|sent|coming)\s+from\b|\borigin\b", re.I)),
+    ("delivery_location", re.compile(r"\b(delivered|going|headed|shipped|sent)\s+to\b|\bdestination\b", re.I)),
+    ("courier_assignment", re.compile(r"\bcourier\b|\bcarrier\b|\bwho\s+is\s+delivering\b", re.I)),
+    ("shipment_details", re.compile(r"\b(details|everything|all\s+info(rmation)?)\b", re.I)),
+    ("shipment_status", re.compile(r"\bstatus\b|\bwhere\s+is\b|\btrack\b", re.I)),
+    ("date_range", re.compile(r"\b(after|before|since|until|between)\b", re.I)),
+]
+
+_UNSUPPORTED_DATE_QUALIFIERS = re.compile(
+    r"\b(in\s+transit|pending|delayed|late|early|on\s+time|cancell?ed|returned|lost|status"
+    r"|how\s+many|count|number\s+of|total|most|least|average|top"
+    r"|not|never|no|without|except)\b|n't\b", re.I)
+
+# Seed utterances for the fallback classifier, written with entities masked
+TRAINING_EXAMPLES = {
+    "business_hours": [
+        "what are your business hours", "when are you open", "what time do you close",
+        "are you open on saturday", "what are your working hours",
+    ],
+    "shipment_status": [
+        "what is the status of shipment <tracking_number>", "where is <tracking_number>",
+        "status of <tracking_number>", "has <tracking_number> been delivered", "track <tracking_number>",
+        "is shipment <tracking_number> in transit",
+    ],
+    "dispatch_location": [
+        "where was shipment <tracking_number> dispatched from", "origin of <tracking_number>",
+        "which city did <tracking_number> ship from",
+    ],
+    "delivery_location": [
+        "where is shipment <tracking_number> going", "destination of <tracking_number>",
+        "where will <tracking_number> be delivered",
+    ],
+    "courier_assignment": [
+        "what courier is assigned to shipment <tracking_number>", "who is delivering <tracking_number>",
+        "which carrier has <tracking_number>",
+    ],
+    "shipment_details": [
+        "show me details for shipment <tracking_number>", "tell me everything about <tracking_number>",
+        "give me all information on <tracking_number>",
+    ],
+    "date_range": [
+        "list shipments expected to arrive after <date>", "shipments expected before <date>",
+        "which shipments arrive between <date> and <date>", "shipments dispatched after <date>",
+    ],
+    "other": [
+        "which shipments did <courier> deliver early", "show all shipments going to <location>",
+        "what shipments does <customer> have", "list delayed shipments", "how many shipments are in transit",
+        "which customer has the most shipments", "list shipments handled by <courier>",
+    ],
+}
+
+
+class Route(NamedTuple):
+    intent: str
+    confidence: float
+    cypher: Optional[str]
+    params: Dict[str, Any]
+
+
+class NaiveBayesClassifier:
+    """Multinomial naive Bayes over word tokens, small enough to train at startup"""
+
+    def __init__(self, examples, alpha=1.0):
+        self.alpha = alpha
+        self.word_counts = {intent: Counter() for intent in examples}
+        self.priors = {}
+        total = sum(len(texts) for texts in examples.values())
+        for intent, texts in examples.items():
+            self.priors[intent] = math.log(len(texts) / total)
+            for text in texts:
+                self.word_counts[intent].update(self.tokenize(text))
+        self.vocabulary = set().union(*self.word_counts.values())
+        self.totals = {intent: sum(counts.values()) for intent, counts in self.word_counts.items()}
+
+    @staticmethod
+    def tokenize(text):
+        return re.findall(r"<\w+>|\w+", text.lower())
+
+    def predict(self, text):
+        """Return (intent, posterior probability)"""
+        tokens = [t for t in self.tokenize(text) if t in self.vocabulary]
+        denominator = len(self.vocabulary) * self.alpha
+        scores = {
+            intent: self.priors[intent] + sum(
+                math.log((counts[t] + self.alpha) / (self.totals[intent] + denominator)) for t in tokens
+            )
+            for intent, counts in self.word_counts.items()
+        }
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / norm
+
+
+class IntentRouter:
+    """Maps common questions to parameterized Cypher templates.
+
+    A question is routed only when exactly one rule matches and the
+    classifier agrees with it; everything else goes to the LLM. A route
+    carries Cypher only when confidence clears the threshold and every slot the
+    template needs was extracted; otherwise the caller falls back to the LLM.
+    """
+
+    def __init__(self, extractor, threshold=None):
+        self.extractor = extractor
+        self.threshold = float(threshold or os.getenv("INTENT_CONFIDENCE_THRESHOLD", 0.8))
+        self.classifier = NaiveBayesClassifier(TRAINING_EXAMPLES)
+        self._lock = threading.Lock()
+        self.routed = Counter()
+        self.requests = 0
+        self.served_without_llm = 0
+
+    def classify(self, question, masked):
+        predicted, probability = self.classifier.predict(masked)
+        matched = {intent for intent, pattern in RULES if pattern.search(question)}
+        if not matched:
+            # The classifier alone is too eager ("weight of <tracking_number>" looks like a
+            # status question), so without a rule the question goes to the LLM
+            return predicted, 0.0
+        # A rule only counts when the classifier agrees; several matching
+        # rules mean a multi-part question no single template answers
+        if matched == {predicted}:
+            return predicted, max(0.9, probability)
+        return next(intent for intent, _ in RULES if intent in matched), 0.0
+
+    def _build(self, intent, question, slots):
+        if intent in NO_QUERY_INTENTS:
+            return "", {}
+        if intent in TEMPLATES:
+            tracking = slots.get("tracking_number", [])
+            if len(tracking) != 1:
+                return None
+            return TEMPLATES[intent], {"tracking_number": tracking[0]}
+        if intent == "date_range":
+            dates = slots.get("date", [])
+            # Any other entity means extra filters the template cannot express
+            if set(slots) != {"date"}:
+                return None
+            # Filters, counts and negations the template cannot express go to the LLM
+            if _UNSUPPORTED_DATE_QUALIFIERS.search(question):
+                return None
+            if re.search(r"\bdelivered\b", question, re.I):
+                # "delivered after <date>" filters on delivery_date; any other use is a status filter
+                if not re.search(r"\bdelivered\s+(after|before|since|until|between)\b", question, re.I):
+                    return None
+                field = "delivery_date"
+            elif re.search(r"\b(dispatch|sent|shipped)", question, re.I):
+                field = "dispatch_date"
+            else:
+                field = "expected_delivery_date"
+            if re.search(r"\bbetween\b", question, re.I) and len(dates) == 2:
+                condition, params = f"s.{field} >= $start AND s.{field} <= $end", {"start": min(dates), "end": max(dates)}
+            elif len(dates) != 1:
+                return None
+            elif re.search(r"\b(after|since)\b", question, re.I):
+                condition, params = f"s.{field} > $date", {"date": dates[0]}
+            elif re.search(r"\b(before|until)\b", question, re.I):
+                condition, params = f"s.{field} < $date", {"date": dates[0]}
+            else:
+                return None
+            return f"MATCH (s:Shipment) WHERE {condition} RETURN s.tracking_number", params
+        return None
+
+    def route(self, question):
+        masked, entities = self.extractor.extract(question)
+        intent, confidence = self.classify(question, masked)
+        slots = defaultdict(list)
+        for slot, value in entities:
+            slots[slot].append(value)
+        built = self._build(intent, question, dict(slots)) if confidence >= self.threshold else None
+        with self._lock:
+            self.requests += 1
+            self.routed[intent if built is not None else "llm_fallback"] += 1
+        if built is None:
+            return Route(intent, confidence, None, {})
+        return Route(intent, confidence, built[0], built[1])
+
+    def record_served(self, used_llm):
+        with self._lock:
+            if not used_llm:
+                self.served_without_llm += 1
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "routes": dict(self.routed),
+            "served_without_llm": self.served_without_llm,
+            "fraction_without_llm": self.served_without_llm / self.requests if self.requests else 0.0,
+        }
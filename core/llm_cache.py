@@ -0,0 +1,228 @@
+# core/llm_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from langchain.schema import AIMessage
+from core.utils import RateLimiter, run_blocking
+
+
+def _normalize_messages(messages):
+    """Turn a prompt string, (role, content) tuples or message objects into plain pairs"""
+    if isinstance(messages, str):
+        return [["human", messages]]
+    normalized = []
+    for message in messages:
+        if isinstance(message, (tuple, list)):
+            role, content = message
+        else:
+            role, content = message.type, message.content
+        normalized.append([role, content])
+    return normalized
+
+
+def make_key(model, temperature, messages):
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": _normalize_messages(messages)},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteLLMCache:
+    """Content-addressed key/value store on SQLite.
+
+    WAL mode plus a busy timeout lets several worker processes share one file.
+    Entries are evicted least-recently-used first once the cache holds more
+    than ``max_entries`` rows or ``max_bytes`` of values.
+    """
+
+    def __init__(self, path=None, max_entries=None, max_bytes=None):
+        self.path = path or os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite")
+        self.max_entries = max_entries or int(os.getenv("LLM_CACHE_MAX_ENTRIES", 100_000))
+        self.max_bytes = max_bytes or int(os.getenv("LLM_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._create()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection must not cross a fork, so reopen it in child processes
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _create(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)")
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return row[0]
+
+    def put(self, key, value):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), time.time()),
+            )
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+            if count > self.max_entries or total > self.max_bytes:
+                self._evict(conn, count, total)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn, count, total):
+        # Trim to 90% of the limits so eviction is not paid on every insert
+        target_count, target_bytes = int(self.max_entries * 0.9), int(self.max_bytes * 0.9)
+        rows = conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access")
+        doomed = []
+        for key, size in rows:
+            if count <= target_count and total <= target_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+
+    def stats(self):
+        count, total = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Process-wide cache, or None when ``LLM_CACHE_DISABLED=1``"""
+    global _cache
+    if os.getenv("LLM_CACHE_DISABLED") == "1":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SQLiteLLMCache()
+        return _cache
+
+
+_rate_limiter = None
+
+
+def get_llm_rate_limiter():
+    """Process-wide limiter for LLM calls that miss the cache, or None if ``LLM_CALLS_PER_MINUTE`` is unset"""
+    global _rate_limiter
+    per_minute = float(os.getenv("LLM_CALLS_PER_MINUTE", 0) or 0)
+    if per_minute <= 0:
+        return None
+    with _cache_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(per_minute, burst=int(os.getenv("LLM_CALLS_BURST", 10)))
+        return _rate_limiter
+
+
+class CachedChatModel:
+    """Wraps a chat model so identical (model, temperature, messages) calls are answered from the cache.
+
+    Calls that reach the model are paced by the process-wide LLM rate limiter.
+    """
+
+    def __init__(self, llm, cache=None, rate_limiter=None):
+        self.llm = llm
+        self.cache = cache if cache is not None else get_llm_cache()
+        self.rate_limiter = rate_limiter or get_llm_rate_limiter()
+        self.model = getattr(llm, "model_name", None) or getattr(llm, "model", "")
+        self.temperature = getattr(llm, "temperature", None)
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+    def _key(self, messages):
+        return make_key(self.model, self.temperature, messages)
+
+    def _call(self, messages):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        return self.llm.invoke(messages)
+
+    async def _acall(self, messages):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aacquire()
+        return await self.llm.ainvoke(messages)
+
+    def invoke(self, messages):
+        if self.cache is None:
+            return self._call(messages)
+        key = self._key(messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return AIMessage(content=cached)
+        response = self._call(messages)
+        self.cache.put(key, response.content)
+        return response
+
+    async def ainvoke(self, messages):
+        if self.cache is None:
+            return await self._acall(messages)
+        key = self._key(messages)
+        cached = await run_blocking(self.cache.get, key)
+        if cached is not None:
+            return AIMessage(content=cached)
+        response = await self._acall(messages)
+        await run_blocking(self.cache.put, key, response.content)
+        return response
+
+    async def astream(self, messages):
+        """Yield text chunks; a cached response arrives as a single chunk"""
+        key = self._key(messages) if self.cache is not None else None
+        if key is not None:
+            cached = await run_blocking(self.cache.get, key)
+            if cached is not None:
+                yield cached
+                return
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aacquire()
+        chunks = []
+        async for chunk in self.llm.astream(messages):
+            chunks.append(chunk.content)
+            yield chunk.content
+        if key is not None:
+            await run_blocking(self.cache.put, key, "".join(chunks))
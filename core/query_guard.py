@@ -0,0 +1,183 @@
+# core/query_guard.py
+import os
+import time
+import asyncio
+import threading
+from collections import Counter, OrderedDict, deque
+from typing import List, NamedTuple
+from core.cypher_params import fingerprint
+from core.results import inject_limit
+
+# Severity order: a plan gets the most severe action any of its operators calls for
+ACTIONS = ("allow", "throttle", "reject")
+
+
+class QueryRejected(ValueError):
+    """Raised instead of running a query whose plan is too expensive"""
+
+    def __init__(self, verdict):
+        super().__init__("Query rejected by pre-flight check: " + "; ".join(verdict.reasons))
+        self.verdict = verdict
+
+
+class Verdict(NamedTuple):
+    action: str
+    reasons: List[str]
+    estimated_rows: float
+
+
+def walk_plan(plan):
+    """Yield every operator of an EXPLAIN plan, root first"""
+    stack = [plan]
+    while stack:
+        operator = stack.pop()
+        yield operator
+        stack.extend(operator.get("children", []))
+
+
+def _operator(operator):
+    return operator.get("operatorType", "").split("@")[0]
+
+
+def _estimate(operator):
+    # summary.plan is raw Bolt metadata, where operator arguments live under "args"
+    return float(operator.get("args", {}).get("EstimatedRows", 0) or 0)
+
+
+class QueryGuard:
+    """Pre-flight check of generated Cypher against its EXPLAIN plan.
+
+    - ``CartesianProduct`` and ``AllNodesScan`` are throttled, or rejected when
+      they are estimated to touch too many rows.
+    - ``NodeByLabelScan`` over a large label is throttled.
+    - A plan estimated to return too many rows is rejected unless a LIMIT
+      can be injected for paging.
+
+    Throttled queries share ``max_expensive`` slots. Verdicts are cached by
+    query fingerprint for ``cache_ttl`` seconds. Thresholds default to the
+    ``QUERY_GUARD_*`` environment variables.
+    """
+
+    def __init__(self, connector, max_cartesian_rows=None, large_label_rows=None, max_estimated_rows=None,
+                 max_expensive=None, cache_ttl=None, cache_size=1000):
+        self.connector = connector
+        self.max_cartesian_rows = float(max_cartesian_rows or os.getenv("QUERY_GUARD_MAX_CARTESIAN_ROWS", 10000))
+        self.large_label_rows = float(large_label_rows or os.getenv("QUERY_GUARD_LARGE_LABEL_ROWS", 100000))
+        self.max_estimated_rows = float(max_estimated_rows or os.getenv("QUERY_GUARD_MAX_ESTIMATED_ROWS", 100000))
+        self.cache_ttl = float(cache_ttl or os.getenv("QUERY_GUARD_CACHE_TTL", 600))
+        self.cache_size = cache_size
+        self._slots = threading.BoundedSemaphore(int(max_expensive or os.getenv("QUERY_GUARD_MAX_EXPENSIVE", 2)))
+        self._verdicts = OrderedDict()  # fingerprint -> (verdict, expires_at)
+        self._lock = threading.Lock()
+        self.actions = Counter()
+        self.rejection_reasons = Counter()
+        self.recent_rejections = deque(maxlen=50)
+        self.explains = 0
+
+    def judge(self, query, plan):
+        """Verdict for ``query`` given its EXPLAIN plan"""
+        action, reasons = "allow", []
+
+        def escalate(new_action, reason):
+            nonlocal action
+            reasons.append(reason)
+            if ACTIONS.index(new_action) > ACTIONS.index(action):
+                action = new_action
+
+        for operator in walk_plan(plan):
+            name, rows = _operator(operator), _estimate(operator)
+            if name == "CartesianProduct":
+                escalate("reject" if rows > self.max_cartesian_rows else "throttle", f"CartesianProduct of ~{rows:.0f} rows")
+            elif name == "AllNodesScan":
+                escalate("reject" if rows > self.large_label_rows else "throttle", f"AllNodesScan of ~{rows:.0f} nodes")
+            elif name == "NodeByLabelScan" and rows > self.large_label_rows:
+                details = operator.get("args", {}).get("Details", "")
+                escalate("throttle", f"NodeByLabelScan of {details or 'a label'} (~{rows:.0f} nodes)")
+
+        estimated = _estimate(plan)
+        # A pageable query gets a LIMIT from BaseBot.bound_cypher anyway; only an unboundable one is refused
+        if estimated > self.max_estimated_rows and inject_limit(query) is None:
+            escalate("reject", f"Estimated ~{estimated:.0f} result rows")
+        return Verdict(action, reasons, estimated)
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._verdicts.get(key)
+            if entry is None or time.monotonic() >= entry[1]:
+                self._verdicts.pop(key, None)
+                return None
+            self._verdicts.move_to_end(key)
+            return entry[0]
+
+    def _record(self, key, query, verdict):
+        with self._lock:
+            if key is not None:
+                self._verdicts[key] = (verdict, time.monotonic() + self.cache_ttl)
+                while len(self._verdicts) > self.cache_size:
+                    self._verdicts.popitem(last=False)
+            self.actions[verdict.action] += 1
+            if verdict.action == "reject":
+                self.rejection_reasons.update(reason.split(" ")[0] for reason in verdict.reasons)
+                self.recent_rejections.append({"query": query, "reasons": verdict.reasons, "at": time.time()})
+
+    def check(self, query, params=None):
+        """Verdict for a parameterized read query; raises QueryRejected if it must not run"""
+        key = fingerprint(query)
+        verdict = self._cached(key)
+        if verdict is None:
+            self.explains += 1
+            verdict = self.judge(query, self.connector.explain(query, params))
+        else:
+            key = None
+        self._record(key, query, verdict)
+        if verdict.action == "reject":
+            raise QueryRejected(verdict)
+        return verdict
+
+    async def acheck(self, query, params, async_connector):
+        """check() with the EXPLAIN sent through an AsyncNeo4jConnector"""
+        key = fingerprint(query)
+        verdict = self._cached(key)
+        if verdict is None:
+            self.explains += 1
+            verdict = self.judge(query, await async_connector.explain(query, params))
+        else:
+            key = None
+        self._record(key, query, verdict)
+        if verdict.action == "reject":
+            raise QueryRejected(verdict)
+        return verdict
+
+    def acquire(self, verdict):
+        """Take an expensive-query slot if ``verdict`` asks for throttling; returns whether one was taken"""
+        if verdict is None or verdict.action != "throttle":
+            return False
+        self._slots.acquire()
+        return True
+
+    async def aacquire(self, verdict, poll_interval=0.02, max_interval=0.1):
+        """acquire() for coroutines, waiting without holding a thread.
+
+        The slot is taken with a non-blocking attempt in the awaiting task
+        itself, so a cancelled waiter (client disconnect, timeout) never takes
+        a slot it cannot release.
+        """
+        if verdict is None or verdict.action != "throttle":
+            return False
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(poll_interval)
+            poll_interval = min(poll_interval * 2, max_interval)
+        return True
+
+    def release(self, taken):
+        if taken:
+            self._slots.release()
+
+    def stats(self):
+        return {
+            "explains": self.explains,
+            "cached_verdicts": len(self._verdicts),
+            "actions": dict(self.actions),
+            "rejection_reasons": dict(self.rejection_reasons),
+            "recent_rejections": list(self.recent_rejections)[-10:],
+        }
@@ -0,0 +1,96 @@
+# core/result_cache.py
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from core.cypher_params import parameterize
+from core.results import Rows
+
+
+def cache_key(query, params=None, limits=None):
+    """Key on the parameterized query text, every parameter value and any row/byte limits"""
+    try:
+        prepared = parameterize(query)
+        text, lifted = prepared.query, prepared.params
+    except ValueError:
+        text, lifted = query, {}
+    values = {**lifted, **(params or {})}
+    key = text + "\x00" + json.dumps(values, sort_keys=True, default=str)
+    if limits and any(limit is not None for limit in limits):
+        key += "\x00" + json.dumps(list(limits))
+    return key
+
+
+class ResultCache:
+    """LRU cache of read-query results, bounded by entry count and approximate size.
+
+    Every entry remembers the graph version it was read at and is dropped as soon
+    as the connector reports a newer version, or when its TTL runs out.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, default_ttl=None):
+        self.max_entries = max_entries or int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 1024))
+        self.max_bytes = max_bytes or int(os.getenv("RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+        self.default_ttl = float(os.getenv("RESULT_CACHE_TTL", 60) if default_ttl is None else default_ttl)
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, key):
+        size = self._entries.pop(key)[1]
+        self._bytes -= size
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                rows, _, expires_at, entry_version, truncated = entry
+                if entry_version == version and time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return Rows([dict(row) for row in rows], truncated)
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, rows, version, ttl=None):
+        size = len(key) + len(json.dumps(rows, default=str))
+        if size > self.max_bytes:
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (
+                [dict(row) for row in rows], size, time.monotonic() + ttl, version, getattr(rows, "truncated", False)
+            )
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypasses += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bypasses": self.bypasses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,146 @@
+# core/result_compare.py
+import json
+import hashlib
+from collections import Counter
+from functools import lru_cache
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from core.dataset_store import canonical_result, parse_expected
+
+FLOAT_DIGITS = 6
+
+
+class Comparison(NamedTuple):
+    match: bool
+    precision: float
+    recall: float
+
+
+def normalize_value(value):
+    """Canonical form of one value: whole floats as ints, rounded floats, nested lists and maps sorted"""
+    if isinstance(value, bool) or value is None or isinstance(value, (int, str)):
+        return value
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else round(value, FLOAT_DIGITS)
+    if isinstance(value, dict):
+        return {key: normalize_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        # collect() and friends return lists in no particular order
+        return sorted((normalize_value(item) for item in value), key=_dump)
+    return value
+
+
+def _dump(value):
+    return json.dumps(value, sort_keys=True)
+
+
+def row_hash(row, ignore_aliases=False):
+    """Signed 64-bit hash of a normalized row.
+
+    With ``ignore_aliases`` a dict row is reduced to the multiset of its
+    values, so ``RETURN s.name`` and ``RETURN s.name AS name`` hash alike.
+    """
+    row = normalize_value(row)
+    if ignore_aliases and isinstance(row, dict):
+        row = sorted((_dump(value) for value in row.values()))
+    digest = hashlib.blake2b(_dump(row).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+@lru_cache(maxsize=65536)
+def _text_hashes(text, ignore_aliases):
+    result = parse_expected(text)
+    if not isinstance(result, list):
+        return None
+    return tuple(row_hash(row, ignore_aliases) for row in result)
+
+
+def result_hashes(result, ignore_aliases=False):
+    """Row hashes of a result set, or None if it is not a list of rows.
+
+    Strings (stored expected outputs, saved result files) are parsed once and
+    their hashes memoized, so comparing against the same expected output
+    again costs a dictionary lookup.
+    """
+    if isinstance(result, str):
+        return _text_hashes(result, ignore_aliases)
+    result = canonical_result(result)
+    if not isinstance(result, list):
+        return None
+    return tuple(row_hash(row, ignore_aliases) for row in result)
+
+
+def _score(overlap, actual_rows, expected_rows):
+    """Precision and recall of an overlap; two empty results agree perfectly"""
+    precision = np.where(actual_rows > 0, overlap / np.maximum(actual_rows, 1), (expected_rows == 0) * 1.0)
+    recall = np.where(expected_rows > 0, overlap / np.maximum(expected_rows, 1), (actual_rows == 0) * 1.0)
+    return precision, recall
+
+
+def compare(actual, expected, ignore_aliases=False):
+    """Compare two result sets as multisets of rows, ignoring row order"""
+    actual_hashes = result_hashes(actual, ignore_aliases)
+    expected_hashes = result_hashes(expected, ignore_aliases)
+    if actual_hashes is None or expected_hashes is None:
+        return Comparison(False, 0.0, 0.0)
+    actual_counts, expected_counts = Counter(actual_hashes), Counter(expected_hashes)
+    overlap = sum((actual_counts & expected_counts).values())
+    precision, recall = _score(overlap, len(actual_hashes), len(expected_hashes))
+    return Comparison(actual_counts == expected_counts, float(precision), float(recall))
+
+
+def compare_frame(df, actual="generated_answer", expected="expected_answer", ignore_aliases=False):
+    """compare() for every row of ``df`` at once.
+
+    Rows are hashed per cell, then the multiset overlap of all rows is
+    computed with a single group-by over (row, hash, side). Returns a frame
+    aligned with ``df`` holding ``execution_accuracy``, ``execution_precision``
+    and ``execution_recall``.
+    """
+    hashes = {
+        side: df[column].reset_index(drop=True).map(lambda value: result_hashes(value, ignore_aliases))
+        for side, column in (("actual", actual), ("expected", expected))
+    }
+    valid = (hashes["actual"].notna() & hashes["expected"].notna()).to_numpy()
+
+    parts = []
+    for side, series in hashes.items():
+        exploded = series[valid].explode().dropna()
+        parts.append(pd.DataFrame({"pos": exploded.index, "side": side, "hash": exploded.to_numpy(dtype=np.int64)}))
+    counts = (
+        pd.concat(parts).groupby(["pos", "hash", "side"]).size()
+        .unstack("side", fill_value=0).reindex(columns=["actual", "expected"], fill_value=0)
+    )
+    totals = pd.DataFrame({
+        "actual": counts["actual"],
+        "expected": counts["expected"],
+        "overlap": counts.min(axis=1),
+        "differs": counts["actual"] != counts["expected"],
+    }).groupby(level="pos").sum().reindex(range(len(df)), fill_value=0)
+
+    actual_rows, expected_rows, overlap = (totals[name].to_numpy() for name in ("actual", "expected", "overlap"))
+    precision, recall = _score(overlap, actual_rows, expected_rows)
+    return pd.DataFrame({
+        "execution_accuracy": valid & (totals["differs"].to_numpy() == 0),
+        "execution_precision": np.where(valid, precision, 0.0),
+        "execution_recall": np.where(valid, recall, 0.0),
+    }, index=df.index)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Re-score execution accuracy of saved evaluation results")
+    parser.add_argument("results", nargs="+", help="Result CSVs written by the bots' evaluate()")
+    parser.add_argument("--ignore-aliases", action="store_true", help="Compare rows by values only")
+    args = parser.parse_args()
+
+    for path in args.results:
+        scores = compare_frame(pd.read_csv(path), ignore_aliases=args.ignore_aliases)
+        print(f"📊 {path}: {len(scores)} rows")
+        for column in scores.columns:
+            print(f"   {column.replace('_', ' ').title()}: {scores[column].mean():.2%}")
+
+
+if __name__ == "__main__":
+    main()
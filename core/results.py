@@ -0,0 +1,137 @@
+# core/results.py
+import os
+import re
+import json
+import time
+import secrets
+import threading
+from collections import OrderedDict
+from core.cypher_params import mask_nested
+
+_RETURN = re.compile(r"\bRETURN\b", re.IGNORECASE)
+_BOUNDS = re.compile(r"\b(SKIP|LIMIT|UNION)\b", re.IGNORECASE)
+_ORDER = re.compile(r"\bORDER\s+BY\b", re.IGNORECASE)
+
+
+def row_limits(max_rows=None, max_bytes=None):
+    """Per-response (row, byte) caps, defaulting to ``RESULT_MAX_ROWS`` and ``RESULT_MAX_BYTES``"""
+    return (
+        int(max_rows or os.getenv("RESULT_MAX_ROWS", 1000)),
+        int(max_bytes or os.getenv("RESULT_MAX_BYTES", 1024 * 1024)),
+    )
+
+
+class Rows(list):
+    """Result rows plus whether a row or byte limit cut them short"""
+
+    def __init__(self, rows=(), truncated=False):
+        super().__init__(rows)
+        self.truncated = truncated
+
+
+class RowBudget:
+    """Admits rows until ``max_rows`` or ``max_bytes`` (JSON size) would be exceeded.
+
+    The first row is always admitted, so paging can make progress past a
+    single oversized row.
+    """
+
+    def __init__(self, max_rows=None, max_bytes=None):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.rows = 0
+        self.bytes = 0
+        self.truncated = False
+
+    def admit(self, row):
+        if self.max_rows is not None and self.rows >= self.max_rows:
+            self.truncated = True
+            return False
+        if self.max_bytes is not None:
+            size = len(json.dumps(row, default=str))
+            if self.rows and self.bytes + size > self.max_bytes:
+                self.truncated = True
+                return False
+            self.bytes += size
+        self.rows += 1
+        return True
+
+
+def collect_rows(rows, max_rows=None, max_bytes=None):
+    """Read dict rows from an iterator until a limit is hit; never reads past the first rejected row"""
+    budget = RowBudget(max_rows, max_bytes)
+    collected = []
+    for row in rows:
+        if not budget.admit(row):
+            break
+        collected.append(row)
+    return Rows(collected, budget.truncated)
+
+
+def inject_limit(query):
+    """Append ``SKIP $page_skip LIMIT $page_limit`` to a read query that does not bound itself.
+
+    Returns None when the query already has SKIP/LIMIT after its final RETURN,
+    has no RETURN, or is a UNION (where a trailing LIMIT binds to the last part).
+    """
+    text = query.rstrip().rstrip(";").rstrip()
+    flat = mask_nested(text)
+    returns = list(_RETURN.finditer(flat))
+    if not returns or _BOUNDS.search(flat, returns[-1].end()) or re.search(r"\bUNION\b", flat, re.IGNORECASE):
+        return None
+    return f"{text} SKIP $page_skip LIMIT $page_limit"
+
+
+def is_ordered(query):
+    """True if the query sorts its final result with ORDER BY"""
+    flat = mask_nested(query)
+    returns = list(_RETURN.finditer(flat))
+    return bool(returns) and _ORDER.search(flat, returns[-1].end()) is not None
+
+
+class CursorStore:
+    """Server-side paging state: an opaque token maps to (cypher, params, offset).
+
+    The offset is part of the token (``<id>.<offset>``) and the stored entry
+    never changes, so fetching a page is idempotent: a retried request gets
+    the same rows and the same next token. Entries expire ``ttl`` seconds
+    after last use and the least recently used are dropped beyond
+    ``max_entries``, so abandoned cursors cost nothing for long.
+    """
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = float(ttl or os.getenv("RESULT_CURSOR_TTL", 600))
+        self.max_entries = int(max_entries or os.getenv("RESULT_CURSOR_MAX_ENTRIES", 1000))
+        self._entries = OrderedDict()  # id -> (cypher, params, expires_at)
+        self._lock = threading.Lock()
+
+    def open(self, cypher, params, offset):
+        entry_id = secrets.token_urlsafe(16)
+        with self._lock:
+            self._entries[entry_id] = (cypher, dict(params or {}), time.monotonic() + self.ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return f"{entry_id}.{offset}"
+
+    def _parse(self, token):
+        entry_id, _, offset = token.rpartition(".")
+        return (entry_id, int(offset)) if entry_id and offset.isdigit() else (None, None)
+
+    def get(self, token):
+        """(cypher, params, offset) for a live token, or None"""
+        entry_id, offset = self._parse(token)
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry[2]:
+                del self._entries[entry_id]
+                return None
+            # Using a cursor extends its lifetime
+            self._entries[entry_id] = (entry[0], entry[1], time.monotonic() + self.ttl)
+            self._entries.move_to_end(entry_id)
+            return entry[0], entry[1], offset
+
+    def token(self, token, offset):
+        """Token for ``offset`` within the same result as ``token``"""
+        return f"{self._parse(token)[0]}.{offset}"
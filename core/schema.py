@@ -0,0 +1,168 @@
+# core/schema.py
+import re
+import csv
+import glob
+from collections import Counter
+from datetime import datetime, timezone
+
+# Applied in order; every statement is idempotent thanks to IF NOT EXISTS.
+SCHEMA_STATEMENTS = [
+    ("shipment_tracking_number_unique",
+     "CREATE CONSTRAINT shipment_tracking_number_unique IF NOT EXISTS "
+     "FOR (s:Shipment) REQUIRE s.tracking_number IS UNIQUE"),
+    ("location_name_unique",
+     "CREATE CONSTRAINT location_name_unique IF NOT EXISTS "
+     "FOR (l:Location) REQUIRE l.name IS UNIQUE"),
+    ("customer_name_unique",
+     "CREATE CONSTRAINT customer_name_unique IF NOT EXISTS "
+     "FOR (c:Customer) REQUIRE c.name IS UNIQUE"),
+    ("courier_name_unique",
+     "CREATE CONSTRAINT courier_name_unique IF NOT EXISTS "
+     "FOR (c:Courier) REQUIRE c.name IS UNIQUE"),
+    ("shipment_status",
+     "CREATE INDEX shipment_status IF NOT EXISTS FOR (s:Shipment) ON (s.status)"),
+    ("shipment_dispatch_date",
+     "CREATE INDEX shipment_dispatch_date IF NOT EXISTS FOR (s:Shipment) ON (s.dispatch_date)"),
+    ("shipment_expected_delivery_date",
+     "CREATE INDEX shipment_expected_delivery_date IF NOT EXISTS FOR (s:Shipment) ON (s.expected_delivery_date)"),
+]
+
+DEFAULT_QUERY_SOURCES = ["data/cypher_eval.csv", "data/*_results.csv"]
+CYPHER_COLUMNS = ("cypher", "generated_cypher", "expected_cypher")
+
+_NODE_PATTERN = re.compile(r"\(\s*(\w*)\s*:\s*(\w+)\s*(\{[^}]*\})?")
+_MAP_KEY = re.compile(r"(\w+)\s*:")
+_WHERE_CLAUSE = re.compile(
+    r"\bWHERE\b(.*?)(?=\b(?:RETURN|WITH|MATCH|OPTIONAL|ORDER|SET|MERGE|CREATE|DELETE|UNWIND|CALL)\b|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+_WHERE_PREDICATE = re.compile(
+    r"\b(\w+)\.(\w+)\s*(?:=|<>|<=|>=|<|>|\bSTARTS\s+WITH\b|\bENDS\s+WITH\b|\bCONTAINS\b|\bIN\b|\bIS\s+NOT\s+NULL\b)",
+    re.IGNORECASE,
+)
+
+
+def extract_predicates(query):
+    """Return a Counter of (label, property) pairs the query filters on"""
+    predicates = Counter()
+    variables = {}
+    for variable, label, props in _NODE_PATTERN.findall(query):
+        if variable:
+            variables[variable] = label
+        for prop in _MAP_KEY.findall(props or ""):
+            predicates[(label, prop)] += 1
+    for clause in _WHERE_CLAUSE.findall(query):
+        for variable, prop in _WHERE_PREDICATE.findall(clause):
+            if variable in variables:
+                predicates[(variables[variable], prop)] += 1
+    return predicates
+
+
+def load_logged_queries(sources=None):
+    """Read Cypher queries from the evaluation set and the bots' result CSVs"""
+    queries = []
+    for pattern in sources or DEFAULT_QUERY_SOURCES:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, "r", newline="") as f:
+                for row in csv.DictReader(f):
+                    queries.extend(row[col] for col in CYPHER_COLUMNS if row.get(col))
+    return queries
+
+
+class SchemaManager:
+    def __init__(self, connector, statements=SCHEMA_STATEMENTS):
+        self.connector = connector
+        self.statements = statements
+
+    def applied(self):
+        """Names of schema migrations already recorded in the graph"""
+        with self.connector.session() as session:
+            result = session.run("MATCH (m:SchemaMigration) RETURN m.name AS name")
+            return {record["name"] for record in result}
+
+    def apply(self):
+        """Create any missing constraints and indexes and record them as migrations"""
+        done = self.applied()
+        newly_applied = []
+        with self.connector.session() as session:
+            for name, statement in self.statements:
+                if name in done:
+                    continue
+                session.run(statement).consume()
+                session.run("""
+                    MERGE (m:SchemaMigration {name: $name})
+                    SET m.statement = $statement, m.applied_at = $applied_at
+                """, name=name, statement=statement,
+                     applied_at=datetime.now(timezone.utc).isoformat()).consume()
+                newly_applied.append(name)
+        return newly_applied
+
+    def indexed_properties(self):
+        """(label, property) pairs covered by a single-property index or constraint"""
+        with self.connector.session() as session:
+            result = session.run("""
+                SHOW INDEXES YIELD entityType, labelsOrTypes, properties
+                WHERE entityType = 'NODE' AND size(properties) = 1
+                RETURN labelsOrTypes, properties
+            """)
+            return {
+                (label, record["properties"][0])
+                for record in result
+                for label in record["labelsOrTypes"] or []
+            }
+
+    def advise(self, queries, indexed=None, min_count=1):
+        """Recommend indexes for frequently filtered properties that have none"""
+        if indexed is None:
+            indexed = self.indexed_properties()
+        counts = Counter()
+        for query in queries:
+            counts.update(extract_predicates(query))
+        return [
+            {
+                "label": label,
+                "property": prop,
+                "count": count,
+                "statement": (
+                    f"CREATE INDEX {label.lower()}_{prop} IF NOT EXISTS "
+                    f"FOR (n:{label}) ON (n.{prop})"
+                ),
+            }
+            for (label, prop), count in counts.most_common()
+            if count >= min_count and (label, prop) not in indexed
+        ]
+
+
+def main():
+    import argparse
+    from core.database import get_connector
+
+    parser = argparse.ArgumentParser(description='Manage Neo4j constraints and indexes')
+    parser.add_argument('command', choices=['apply', 'status', 'advise'])
+    parser.add_argument('--neo4j-uri', default='bolt://localhost:7687', help='Neo4j connection URI')
+    parser.add_argument('--neo4j-user', default='neo4j', help='Neo4j username')
+    parser.add_argument('--neo4j-password', required=True, help='Neo4j password')
+    parser.add_argument('--source', action='append', help='CSV file or glob with logged Cypher (repeatable)')
+    parser.add_argument('--min-count', type=int, default=2, help='Minimum predicate frequency to recommend')
+    args = parser.parse_args()
+
+    manager = get_connector(args.neo4j_uri, args.neo4j_user, args.neo4j_password).schema
+    if args.command == 'apply':
+        applied = manager.apply()
+        print(f"✅ Applied {len(applied)} schema migration(s): {', '.join(applied) or 'none'}")
+    elif args.command == 'status':
+        done = manager.applied()
+        for name, _ in manager.statements:
+            print(f"{'✅' if name in done else '⏳'} {name}")
+    else:
+        queries = load_logged_queries(args.source)
+        recommendations = manager.advise(queries, min_count=args.min_count)
+        print(f"🔍 Analysed {len(queries)} queries")
+        if not recommendations:
+            print("✅ No missing indexes found")
+        for rec in recommendations:
+            print(f"{rec['count']:>5}x {rec['label']}.{rec['property']}: {rec['statement']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# core/schema_cache.py
+import os
+import time
+import threading
+
+# Bookkeeping labels written by the loaders; they are not part of the domain model
+INTERNAL_LABELS = {"GraphMeta", "SchemaMigration"}
+
+
+def render_schema(labels, relationships, properties):
+    """Compact text rendering of the graph schema for prompts"""
+    lines = ["Graph Schema:", "", "Nodes:"]
+    for label in sorted(labels):
+        lines.append(f"(:{label} {{{', '.join(sorted(properties.get(label, ())))}}})")
+    lines += ["", "Relationships:"]
+    for start, rel_type, end in sorted(relationships):
+        lines.append(f"(:{start})-[:{rel_type}]->(:{end})")
+    return "\n".join(lines)
+
+
+class SchemaCache:
+    """Caches the graph schema and its prompt rendering.
+
+    Entries live for ``ttl`` seconds. After that the cache only re-reads the
+    schema if the graph's schema version (bumped by the populator) changed.
+    """
+
+    def __init__(self, connector, ttl=None):
+        self.connector = connector
+        self.ttl = float(os.getenv("SCHEMA_CACHE_TTL", 300) if ttl is None else ttl)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entry = None
+        self._checked_at = 0.0
+
+    def _load(self, version):
+        nodes, relationships = self.connector.get_schema()
+        labels = {label for node in nodes for label in node.labels} - INTERNAL_LABELS
+        rel_triples = {
+            (next(iter(rel.start_node.labels)), rel.type, next(iter(rel.end_node.labels)))
+            for rel in relationships
+        }
+        rel_triples = {t for t in rel_triples if t[0] in labels and t[2] in labels}
+        properties = {label: set() for label in labels}
+        for label, prop in self.connector.get_node_properties():
+            if label in properties:
+                properties[label].add(prop)
+        return {
+            "version": version,
+            "nodes": nodes,
+            "relationships": relationships,
+            "text": render_schema(labels, rel_triples, properties),
+        }
+
+    def _current(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._entry is not None and now - self._checked_at < self.ttl:
+                self.hits += 1
+                return self._entry
+            version = self.connector.get_schema_version()
+            if self._entry is not None and self._entry["version"] == version:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._entry = self._load(version)
+            self._checked_at = now
+            return self._entry
+
+    def get(self):
+        """Raw ``(nodes, relationships)`` from db.schema.visualization"""
+        entry = self._current()
+        return entry["nodes"], entry["relationships"]
+
+    def text(self):
+        return self._current()["text"]
+
+    def invalidate(self):
+        with self._lock:
+            self._entry = None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "version": self._entry["version"] if self._entry else None,
+            "ttl": self.ttl,
+        }
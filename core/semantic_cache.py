@@ -0,0 +1,147 @@
+# core/semantic_cache.py
+import os
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+from core.embeddings import decode_vectors, embedding_storage, encode_vectors, get_embeddings
+from core.entities import EntityExtractor
+
+
+_NEGATION = re.compile(r"\b(?:not|no|never|none|nor|without|except|excluding)\b|n't\b", re.IGNORECASE)
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_DIRECTION = re.compile(
+    r"\b(?:before|after|since|until|between|from|to|earliest|latest|most|least)\b", re.IGNORECASE)
+
+
+def signature(masked, entities):
+    """What a cached paraphrase must match exactly: entity slots, negations, bare numbers
+    and comparison/direction words.
+
+    Embeddings barely separate "delivered by X" from "not delivered by X",
+    "top 5" from "top 10", "before <date>" from "after <date>" or "from
+    <location>" from "to <location>", so these are compared outside the
+    similarity score.
+    """
+    return (
+        tuple(slot for slot, _ in entities),
+        tuple(sorted(match.lower() for match in _NEGATION.findall(masked))),
+        tuple(_NUMBER.findall(masked)),
+        tuple(match.lower() for match in _DIRECTION.findall(masked)),
+    )
+
+
+def _quote(value):
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def make_template(cypher, entities):
+    """Replace each entity's literal in the Cypher with a numbered placeholder.
+
+    Returns None unless every entity appears as a quoted literal, because only
+    then can the query be safely re-filled with another question's entities.
+    """
+    template = cypher
+    for i, (_, value) in enumerate(entities):
+        pattern = re.compile(r"(['\"])" + re.escape(value) + r"\1", re.IGNORECASE)
+        template, count = pattern.subn(f"\x00{i}\x00", template)
+        if count == 0:
+            return None
+    return template
+
+
+def fill_template(template, entities):
+    for i, (_, value) in enumerate(entities):
+        template = template.replace(f"\x00{i}\x00", _quote(value))
+    return template
+
+
+class SemanticCache:
+    """Reuses validated Cypher for paraphrased questions.
+
+    Questions are embedded with their entities masked ("where is <tracking_number>"),
+    so a hit only needs the same kinds of entities in the same order (and the
+    same negations, numbers and direction words, see ``signature``); the new
+    question's values are substituted into the cached Cypher template. Memory is
+    bounded by ``max_entries`` vectors, evicted least-recently-used first, and
+    stored as ``EMBEDDING_STORAGE`` (float32, float16 or int8).
+    """
+
+    def __init__(self, embeddings=None, extractor=None, threshold=None, max_entries=None, storage=None):
+        self.embeddings = embeddings or get_embeddings()
+        self.extractor = extractor or EntityExtractor()
+        self.threshold = float(threshold or os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.92))
+        self.max_entries = int(max_entries or os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 2000))
+        self.storage = embedding_storage(storage)
+        self._vectors = np.zeros((self.max_entries, self.embeddings.dimension), dtype=self.storage)
+        self._entries = OrderedDict()  # masked question -> (row, signature, template)
+        self._rows = {}  # row -> masked question
+        self._free = list(range(self.max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    def lookup(self, question):
+        """Cypher for ``question`` built from a cached paraphrase, or None"""
+        masked, entities = self.extractor.extract(question)
+        wanted = signature(masked, entities)
+        vector = self.embeddings.embed_query(masked)
+        with self._lock:
+            if self._rows:
+                rows = np.fromiter(self._rows, dtype=np.int64)
+                scores = decode_vectors(self._vectors[rows]) @ vector
+                for idx in np.argsort(-scores):
+                    if scores[idx] < self.threshold:
+                        break
+                    key = self._rows[int(rows[idx])]
+                    _, cached_signature, template = self._entries[key]
+                    if cached_signature == wanted:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return fill_template(template, entities)
+            self.misses += 1
+            return None
+
+    def store(self, question, cypher):
+        """Remember Cypher that executed successfully for ``question``"""
+        masked, entities = self.extractor.extract(question)
+        template = make_template(cypher, entities)
+        if template is None:
+            return False
+        vector = self.embeddings.embed_query(masked)
+        with self._lock:
+            if masked in self._entries:
+                row = self._entries.pop(masked)[0]
+            else:
+                if not self._free:
+                    evicted, (evicted_row, _, _) = self._entries.popitem(last=False)
+                    del self._rows[evicted_row]
+                    self._free.append(evicted_row)
+                    self.evictions += 1
+                row = self._free.pop()
+            self._vectors[row] = encode_vectors(vector, self.storage)
+            self._rows[row] = masked
+            self._entries[masked] = (row, signature(masked, entities), template)
+        return True
+
+    def record_llm_latency(self, seconds):
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        avg_llm = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+        return {
+            "entries": len(self._entries),
+            "vector_bytes": self._vectors.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "avg_llm_seconds": avg_llm,
+            "estimated_seconds_saved": self.hits * avg_llm,
+        }
@@ -0,0 +1,61 @@
+# core/utils.py
+import os
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def blocking_executor():
+    """Bounded pool for work that has no async API (embeddings, SQLite, sync fallbacks)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("BLOCKING_POOL_SIZE", 16)),
+                thread_name_prefix="blocking",
+            )
+        return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the bounded pool without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_blocking_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+class RateLimiter:
+    """Spaces calls to at most ``per_minute``, allowing short bursts of ``burst`` calls"""
+
+    def __init__(self, per_minute, burst=1):
+        self.interval = 60.0 / per_minute
+        self.burst = max(1, burst)
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Claim the next call slot; returns how many seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._next = max(self._next, now - (self.burst - 1) * self.interval)
+            start = self._next
+            self._next += self.interval
+        return max(0.0, start - now)
+
+    def acquire(self):
+        time.sleep(self.reserve())
+
+    async def aacquire(self):
+        await asyncio.sleep(self.reserve())
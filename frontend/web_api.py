@@ -1,14 +1,26 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import List
 import sys
 import os
+import json
+import asyncio
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from bots.interactive_bot import InteractiveBot
+from core.database import aclose_all, close_all
+from core.utils import shutdown_blocking_executor
+from core.coalesce import SingleFlight, normalize_question
 
 app = FastAPI()
 bot = InteractiveBot()
+CHAT_TIMEOUT = float(os.getenv("CHAT_TIMEOUT", 60))
+BATCH_TIMEOUT = float(os.getenv("BATCH_TIMEOUT", 300))
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", 100))
+# Identical questions already in flight share one answer
+coalescer = SingleFlight()
 
 # Allow CORS for local testing
 app.add_middleware(
@@ -19,16 +31,115 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("shutdown")
+async def shutdown():
+    await aclose_all()
+    close_all()
+    shutdown_blocking_executor()
+
+async def run_for_client(request: Request, coro, timeout=CHAT_TIMEOUT):
+    """Await ``coro`` with a timeout, cancelling it if the client disconnects first"""
+    task = asyncio.ensure_future(coro)
+
+    async def watch_disconnect():
+        while not task.done():
+            if await request.is_disconnected():
+                task.cancel()
+                return
+            await asyncio.sleep(0.25)
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        return await asyncio.wait_for(task, timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Request timed out after {timeout:.0f}s")
+    finally:
+        watcher.cancel()
+
+@app.get("/stats")
+async def stats_endpoint():
+    return {
+        "schema_cache": bot.db.schema_cache.stats(),
+        "result_cache": bot.db.result_cache.stats() if bot.db.result_cache else None,
+        "semantic_cache": bot.semantic_cache.stats() if bot.semantic_cache else None,
+        "embeddings": bot.semantic_cache.embeddings.stats() if bot.semantic_cache else None,
+        "intent_router": bot.router.stats(),
+        "coalescing": coalescer.stats(),
+        "query_guard": bot.db.guard.stats() if bot.db.guard else None,
+    }
+
 class QueryRequest(BaseModel):
     user_input: str
 
 @app.post("/chat")
-async def chat_endpoint(req: QueryRequest):
-    user_input = req.user_input
-    if "hours" in user_input or "work" in user_input or "business" in user_input or "open" in user_input:
-        answer = bot.generate_answer(user_input)
-        return {"response": answer}
-    else:
-        cypher, cypher_answer = bot.generate_cypher(user_input)
-        answer = bot.generate_answer(user_input, cypher, cypher_answer)
-        return {"response": answer, "cypher": cypher, "cypher_answer": cypher_answer}
+async def chat_endpoint(req: QueryRequest, request: Request):
+    question = req.user_input
+    # The coalesced reply is shared, so each caller gets its own cursor into it
+    reply = await run_for_client(
+        request, coalescer.run(normalize_question(question), lambda: bot.arespond(question, open_cursor=False))
+    )
+    return bot.open_cursor(reply)
+
+@app.get("/chat/page/{cursor}")
+async def chat_page_endpoint(cursor: str, request: Request):
+    """Next rows for the ``cursor`` of a truncated reply"""
+    page = await run_for_client(request, bot.anext_page(cursor))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Cursor not found or expired")
+    return page
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(req: QueryRequest):
+    """Server-Sent Events: ``cypher``, then ``rows`` pages, then ``answer`` tokens, then ``done``"""
+    async def events():
+        stages = bot.astream_respond(req.user_input)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + CHAT_TIMEOUT
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(stages.__anext__(), deadline - loop.time())
+                except StopAsyncIteration:
+                    break
+                yield sse_event(event, data)
+        except asyncio.TimeoutError:
+            yield sse_event("error", {"detail": f"Request timed out after {CHAT_TIMEOUT:.0f}s"})
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            await stages.aclose()
+
+    # Starlette cancels this generator when the client disconnects
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+class BatchRequest(BaseModel):
+    questions: List[str]
+
+@app.post("/chat/batch")
+async def chat_batch_endpoint(req: BatchRequest):
+    """NDJSON: one ``{"index", "question", ...reply}`` line per question, in input order"""
+    if len(req.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch")
+
+    async def lines():
+        replies = bot.answer_batch(req.questions)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + BATCH_TIMEOUT
+        try:
+            while True:
+                try:
+                    index, reply = await asyncio.wait_for(replies.__anext__(), deadline - loop.time())
+                except StopAsyncIteration:
+                    break
+                yield json.dumps({"index": index, "question": req.questions[index], **reply}, default=str) + "\n"
+        except asyncio.TimeoutError:
+            yield json.dumps({"error": f"Batch timed out after {BATCH_TIMEOUT:.0f}s"}) + "\n"
+        finally:
+            await replies.aclose()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
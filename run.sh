@@ -1,10 +1,10 @@
 #!/bin/bash
 
-# Step 1: Clear and populate Neo4j
+# Step 1: Sync Neo4j with the shipment snapshot (only changed shipments are written)
 echo "🚀 Populating Neo4j database..."
 python3 scripts/populate_neo4j.py \
     --password "yourpassword" \
-    --clear \
+    --sync snapshot \
     --input data/shipments.json \
     --verify
 
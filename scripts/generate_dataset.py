@@ -1,32 +1,45 @@
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from core.dataset_store import DatasetStore
 
 class DatasetManager:
-    def __init__(self, input_path="data/cypher_eval_with_results.csv"):
+    """Train/test splits of the evaluation set, backed by core.dataset_store.DatasetStore"""
+    def __init__(self, input_path="data/cypher_eval_with_results.csv", store=None):
         self.input_path = input_path
         self.train_path = "data/train_data.csv"
         self.test_path = "data/test_data.csv"
+        self.store = store if store is not None else DatasetStore()
     
-    def split_dataset(self, test_size=0.2):
-        """Split dataset and save to train/test files"""
-        df = pd.read_csv(self.input_path)
-        train_df, test_df = train_test_split(df, test_size=test_size)
-        train_df.to_csv(self.train_path, index=False)
-        test_df.to_csv(self.test_path, index=False)
-        return train_df, test_df
+    def split_dataset(self, test_size=0.2, seed=None):
+        """Load the CSV into the store and record a fresh train/test split"""
+        self.store.import_csv(self.input_path)
+        self.store.split(test_size=test_size, seed=seed)
+        return self.get_dataset()
     
     def get_dataset(self):
         """Load pre-split datasets"""
+        if not self.store.has_splits():
+            self._import_csv_splits()
         return (
-            pd.read_csv(self.train_path),
-            pd.read_csv(self.test_path)
+            self.store.get_split("train"),
+            self.store.get_split("test")
         )
 
+    def _import_csv_splits(self):
+        """One-off migration of splits saved as train/test CSVs by older versions"""
+        train_df = pd.read_csv(self.train_path)
+        test_df = pd.read_csv(self.test_path)
+        self.store.write(train_df.to_dict("records") + test_df.to_dict("records"))
+        self.store.write_split("train", range(len(train_df)))
+        self.store.write_split("test", range(len(train_df), len(train_df) + len(test_df)))
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default="data/cypher_eval_with_results.csv")
     parser.add_argument("--test-size", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=None, help="Shuffle seed, for a reproducible split")
     args = parser.parse_args()
     
-    dm = DatasetManager()
-    dm.split_dataset(test_size=args.test_size)
+    dm = DatasetManager(args.input)
+    train_df, test_df = dm.split_dataset(test_size=args.test_size, seed=args.seed)
+    print(f"✅ {len(train_df)} train / {len(test_df)} test rows in {dm.store.directory}")
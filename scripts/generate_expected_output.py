@@ -56,39 +56,118 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import csv
-from core.database import Neo4jConnector
+import time
+import json
+import threading
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from core.database import get_connector
+from core.dataset_store import canonical_json
+from core.llm_cache import get_llm_cache
 
 class QueryExecutor:
-    def __init__(self, uri, user, password):
-        self.connector = Neo4jConnector(uri, user, password)
-    
-    def run_cypher(self, tx, query):
-        result = tx.run(query)
-        return [dict(record) for record in result]
+    """Runs the ground-truth Cypher of an evaluation CSV and records each result.
+
+    Queries run on a thread pool over the shared connector's driver. Results
+    are cached in the shared SQLite cache under the query's hash plus a
+    fingerprint of the graph, so after a reload only queries whose answer may
+    have changed are run again. Rows are written to the output in input order
+    as soon as every earlier row is done.
+    """
+    def __init__(self, uri, user, password, workers=None, cache=None, use_cache=True):
+        self.connector = get_connector(uri, user, password)
+        self.workers = int(workers or os.getenv("EXPECTED_OUTPUT_WORKERS", 8))
+        self.cache = (cache if cache is not None else get_llm_cache()) if use_cache else None
+        self.cached = 0
+        self.failed = 0
+        self._lock = threading.Lock()
     
+    def graph_fingerprint(self):
+        """Data version from the GraphMeta node plus node and relationship counts.
+
+        The counts come from the count store, so this is cheap, and they catch
+        writers that changed the graph without bumping the version.
+        """
+        records = self.connector.execute_read("""
+            OPTIONAL MATCH (m:GraphMeta {key: 'graph'})
+            WITH coalesce(m.data_version, 0) AS version
+            CALL { MATCH (n) RETURN count(n) AS nodes }
+            CALL { MATCH ()-[r]->() RETURN count(r) AS relationships }
+            RETURN version, nodes, relationships
+        """)
+        return canonical_json(records[0] if records else None)
+
+    def _cache_key(self, cypher_query, fingerprint):
+        payload = json.dumps([cypher_query.strip(), fingerprint])
+        return "expected:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
     def _execute_query(self, cypher_query):
         """Execute a single Cypher query and return formatted results"""
         try:
-            with self.connector.driver.session() as session:
-                return session.execute_read(
-                        self.run_cypher,
-                        cypher_query
-                    )
+            return self.connector.execute_read(cypher_query)
         except Exception as e:
             return [f"Error: {str(e)}"]
 
-    def process_csv(self, input_path, output_path):
+    def _expected_output(self, cypher_query, fingerprint):
+        """Canonical JSON of the query's result, from the cache when the graph is unchanged"""
+        key = self._cache_key(cypher_query, fingerprint) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                with self._lock:
+                    self.cached += 1
+                return cached
+        results = self._execute_query(cypher_query)
+        output = canonical_json(results)
+        if results and isinstance(results[0], str) and results[0].startswith("Error: "):
+            with self._lock:
+                self.failed += 1  # errors are not cached, so the next run tries again
+        elif key is not None:
+            self.cache.put(key, output)
+        return output
+
+    def _ordered(self, pool, func, items):
+        """Results of ``func`` over ``items`` in order, keeping a bounded number in flight"""
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= self.workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def process_csv(self, input_path, output_path, progress_every=2.0):
         """Process CSV file and generate expected outputs"""
-        with open(input_path, 'r') as infile, open(output_path, 'w', newline='') as outfile:
+        with open(input_path, 'r') as infile:
             reader = csv.DictReader(infile)
             fieldnames = reader.fieldnames + ['expected_output']
+            rows = list(reader)
+
+        fingerprint = self.graph_fingerprint()
+        self.cached = self.failed = 0
+        start = last_report = time.perf_counter()
+        tmp = output_path + ".tmp"
+        with open(tmp, 'w', newline='') as outfile, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="expected") as pool:
             writer = csv.DictWriter(outfile, fieldnames=fieldnames)
             writer.writeheader()
-
-            for row in reader:
-                results = self._execute_query(row['cypher'])
-                row['expected_output'] = results
+            outputs = self._ordered(pool, lambda row: self._expected_output(row['cypher'], fingerprint), rows)
+            for done, (row, output) in enumerate(zip(rows, outputs), 1):
+                row['expected_output'] = output
                 writer.writerow(row)
+                now = time.perf_counter()
+                if now - last_report >= progress_every:
+                    outfile.flush()
+                    print(f"⏳ {done}/{len(rows)} rows, {done / (now - start):.1f} rows/s ({self.cached} cached)")
+                    last_report = now
+        os.replace(tmp, output_path)
+
+        elapsed = time.perf_counter() - start
+        print(
+            f"⏱️ {len(rows)} rows in {elapsed:.1f}s ({len(rows) / elapsed if elapsed else 0:.1f} rows/s): "
+            f"{len(rows) - self.cached} run, {self.cached} cached, {self.failed} failed, {self.workers} workers"
+        )
 
 def main():
     import argparse
@@ -98,10 +177,13 @@ def main():
     parser.add_argument('--neo4j-uri', default='bolt://localhost:7687', help='Neo4j connection URI')
     parser.add_argument('--neo4j-user', default='neo4j', help='Neo4j username')
     parser.add_argument('--neo4j-password', required=True, help='Neo4j password')
+    parser.add_argument('--workers', type=int, default=None, help='Parallel queries (default: EXPECTED_OUTPUT_WORKERS or 8)')
+    parser.add_argument('--no-cache', action='store_true', help='Run every query even if the graph is unchanged')
     
     args = parser.parse_args()
     
-    executor = QueryExecutor(args.neo4j_uri, args.neo4j_user, args.neo4j_password)
+    executor = QueryExecutor(args.neo4j_uri, args.neo4j_user, args.neo4j_password,
+                             workers=args.workers, use_cache=not args.no_cache)
     executor.process_csv(args.input, args.output)
     print(f"✅ Expected outputs generated at {args.output}")
 
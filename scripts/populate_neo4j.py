@@ -5,12 +5,195 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import json
+import time
+import hashlib
 import argparse
-from core.database import Neo4jConnector
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from core.database import get_connector
+
+SHIPMENT_FIELDS = (
+    "tracking_number", "dispatch_location", "delivery_location", "status",
+    "dispatch_date", "expected_delivery_date", "delivery_date", "courier", "customer",
+)
+# Fields stored on the Shipment node vs. fields that become relationships; each
+# group has its own hash, so a status change never touches the relationships
+PROPERTY_FIELDS = ("status", "dispatch_date", "expected_delivery_date", "delivery_date")
+LINK_FIELDS = ("dispatch_location", "delivery_location", "courier", "customer")
+
+# Dimension nodes are merged once per batch so the shipment statement below
+# only has to MATCH them instead of re-merging them for every row.
+DIMENSION_QUERIES = {
+    "locations": "UNWIND $names AS name MERGE (:Location {name: name})",
+    "customers": "UNWIND $names AS name MERGE (:Customer {name: name})",
+    "couriers": "UNWIND $names AS name MERGE (:Courier {name: name})",
+}
+
+BULK_SHIPMENT_QUERY = """
+    UNWIND $batch AS row
+    MERGE (s:Shipment {tracking_number: row.tracking_number})
+    SET s.status = row.status, s.dispatch_date = row.dispatch_date, s.expected_delivery_date = row.expected_delivery_date,
+        s.content_hash = row.content_hash, s.links_hash = row.links_hash
+    FOREACH (_ IN CASE WHEN row.status = "Delivered" THEN [1] ELSE [] END |
+        SET s.delivery_date = row.delivery_date
+    )
+    WITH s, row
+    MATCH (d_loc:Location {name: row.dispatch_location})
+    MATCH (del_loc:Location {name: row.delivery_location})
+    MATCH (cust:Customer {name: row.customer})
+    MATCH (courier:Courier {name: row.courier})
+
+    MERGE (s)-[:DISPATCHED_FROM]->(d_loc)
+    MERGE (s)-[:DELIVERED_TO]->(del_loc)
+    MERGE (s)-[:ASSIGNED_TO]->(courier)
+    MERGE (s)-[:BELONGS_TO]->(cust)
+"""
+
+SYNC_LOOKUP_QUERY = """
+    UNWIND $ids AS id
+    MATCH (s:Shipment {tracking_number: id})
+    RETURN id, s.content_hash AS content_hash, s.links_hash AS links_hash,
+        s {.status, .dispatch_date, .expected_delivery_date, .delivery_date} AS props
+"""
+
+# New shipments, or shipments whose locations, courier or customer changed:
+# write the properties and replace all four relationships. Rows are checked by
+# validate_links first, so the MATCHes below always find their dimension nodes.
+SYNC_RELINK_QUERY = """
+    UNWIND $batch AS row
+    MERGE (s:Shipment {tracking_number: row.tracking_number})
+    SET s += row.props, s.content_hash = row.content_hash, s.links_hash = row.links_hash
+    WITH s, row
+    CALL {
+        WITH s
+        MATCH (s)-[old:DISPATCHED_FROM|DELIVERED_TO|ASSIGNED_TO|BELONGS_TO]->()
+        DELETE old
+    }
+    MATCH (d_loc:Location {name: row.dispatch_location})
+    MATCH (del_loc:Location {name: row.delivery_location})
+    MATCH (cust:Customer {name: row.customer})
+    MATCH (courier:Courier {name: row.courier})
+
+    CREATE (s)-[:DISPATCHED_FROM]->(d_loc)
+    CREATE (s)-[:DELIVERED_TO]->(del_loc)
+    CREATE (s)-[:ASSIGNED_TO]->(courier)
+    CREATE (s)-[:BELONGS_TO]->(cust)
+"""
+
+# Property-only changes (status, dates); relationships are left alone
+SYNC_PROPERTIES_QUERY = """
+    UNWIND $batch AS row
+    MATCH (s:Shipment {tracking_number: row.tracking_number})
+    SET s += row.props, s.content_hash = row.content_hash
+"""
+
+DELETE_SHIPMENTS_QUERY = """
+    UNWIND $ids AS id
+    MATCH (s:Shipment {tracking_number: id})
+    DETACH DELETE s
+    RETURN count(*) AS deleted
+"""
+
+
+def content_hash(values):
+    return hashlib.sha1(json.dumps(values, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def shipment_properties(shipment):
+    """Node properties of a shipment; delivery_date only counts once it is Delivered"""
+    props = {field: shipment.get(field) for field in PROPERTY_FIELDS}
+    if props["status"] != "Delivered":
+        props["delivery_date"] = None
+    return props
+
+
+def shipment_row(shipment):
+    """A shipment as a sync row: properties, relationship targets and both hashes"""
+    validate_links(shipment)
+    props = shipment_properties(shipment)
+    links = {field: shipment.get(field) for field in LINK_FIELDS}
+    return {
+        "tracking_number": shipment["tracking_number"], "props": props, **links,
+        "content_hash": content_hash(props), "links_hash": content_hash(links),
+    }
+
+
+def validate_links(shipment):
+    """Raise ValueError unless every field that becomes a relationship has a value"""
+    missing = [field for field in LINK_FIELDS if shipment.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"Shipment {shipment.get('tracking_number')} has no {', '.join(missing)}")
+
+
+def iter_shipments(path, chunk_size=1 << 16, max_object_size=1 << 22):
+    """Stream shipments from a JSON array or a JSONL file without loading it whole.
+
+    An array element that does not decode is read further, up to
+    ``max_object_size`` characters, before it is reported as malformed.
+    """
+    with open(path, "r") as f:
+        head = f.read(chunk_size)
+        if head.lstrip()[:1] != "[":
+            f.seek(0)
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buf, pos = head, head.index("[") + 1
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buf):
+                buf, pos = f.read(chunk_size), 0
+                if not buf:
+                    raise ValueError(f"Unterminated JSON array in {path}")
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                shipment, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Most likely an object cut off by the end of the buffer; the size cap
+                # keeps malformed input from being buffered all the way to EOF
+                chunk = f.read(chunk_size) if len(buf) - pos < max_object_size else ""
+                if not chunk:
+                    raise
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            yield shipment
+            if pos > chunk_size:
+                buf, pos = buf[pos:], 0
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def batched_unique(iterable, size, key):
+    """Like batched(), but starts a new batch instead of repeating a key, so each batch applies as a set"""
+    batch, keys = [], set()
+    for item in iterable:
+        if len(batch) == size or key(item) in keys:
+            yield batch
+            batch, keys = [], set()
+        batch.append(item)
+        keys.add(key(item))
+    if batch:
+        yield batch
 
 class Neo4jPopulator:
     def __init__(self, uri, user, password):
-        self.connector = Neo4jConnector(uri, user, password)
+        self.connector = get_connector(uri, user, password)
     
     def create_graph(self, tx, shipment):
         tx.run("""
@@ -30,9 +213,168 @@ class Neo4jPopulator:
             MERGE (s)-[:ASSIGNED_TO]->(courier)
             MERGE (s)-[:BELONGS_TO]->(cust)
         """, **shipment)
-    
+
+    def merge_dimensions(self, tx, rows):
+        dimensions = {
+            "locations": {r["dispatch_location"] for r in rows} | {r["delivery_location"] for r in rows},
+            "customers": {r["customer"] for r in rows},
+            "couriers": {r["courier"] for r in rows},
+        }
+        for key, query in DIMENSION_QUERIES.items():
+            tx.run(query, names=sorted(name for name in dimensions[key] if name is not None))
+
+    def write_batch(self, tx, batch):
+        """Write one UNWIND batch: dimension nodes first, then shipments and relationships"""
+        rows = []
+        for shipment in batch:
+            row = {field: shipment.get(field) for field in SHIPMENT_FIELDS}
+            # Raises on a null dimension, which would make the MATCHes below drop every relationship of the row
+            synced = shipment_row(shipment)
+            row.update(content_hash=synced["content_hash"], links_hash=synced["links_hash"])
+            rows.append(row)
+        self.merge_dimensions(tx, rows)
+        tx.run(BULK_SHIPMENT_QUERY, batch=rows)
+        return len(rows)
+
+    def _load_batch(self, batch):
+        with self.connector.session() as session:
+            return session.execute_write(self.write_batch, batch)
+
+    def bulk_load(self, shipments, batch_size=1000, workers=1, report_every=10):
+        """Load shipments in UNWIND batches, optionally running batches in parallel.
+
+        Only ``workers * 2`` batches are held in memory at a time, so ``shipments``
+        can be a stream of any length. Returns the number of shipments written.
+        """
+        total, batches = 0, 0
+        start = time.perf_counter()
+
+        def report(final=False):
+            elapsed = time.perf_counter() - start
+            rate = total / elapsed if elapsed else 0.0
+            label = "Loaded" if final else "... loaded"
+            print(f"{label} {total} shipments in {batches} batches ({elapsed:.1f}s, {rate:,.0f} rows/s)")
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for batch in batched(shipments, batch_size):
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        total += future.result()
+                        batches += 1
+                        if batches % report_every == 0:
+                            report()
+                pending.add(pool.submit(self._load_batch, batch))
+            for future in pending:
+                total += future.result()
+                batches += 1
+        report(final=True)
+        return total
+
+    def sync_batch(self, tx, batch):
+        """Apply one batch of (op, entry) changes against the stored hashes; returns counts by outcome.
+
+        ``upsert`` entries are full shipments: new ones are created, changed
+        relationships are replaced, property-only changes are SET in place and
+        identical ones are skipped. ``update`` entries carry a tracking number
+        and some of PROPERTY_FIELDS (e.g. status and delivery_date) and never
+        touch relationships. ``delete`` entries remove the shipment.
+        """
+        current = {
+            record["id"]: record
+            for record in tx.run(SYNC_LOOKUP_QUERY, ids=[entry["tracking_number"] for _, entry in batch])
+        }
+        counts = Counter()
+        relink, properties, deletes = [], [], []
+        for op, entry in batch:
+            existing = current.get(entry["tracking_number"])
+            if op in ("delete", "update"):
+                if existing is None:
+                    counts["missing"] += 1
+                elif op == "delete":
+                    deletes.append(entry["tracking_number"])
+                else:
+                    changes = {field: entry[field] for field in PROPERTY_FIELDS if field in entry}
+                    props = shipment_properties({**existing["props"], **changes})
+                    row = {"tracking_number": entry["tracking_number"], "props": props, "content_hash": content_hash(props)}
+                    if row["content_hash"] == existing["content_hash"]:
+                        counts["unchanged"] += 1
+                    else:
+                        properties.append(row)
+                        counts["updated"] += 1
+                continue
+
+            row = shipment_row(entry)
+            if existing is None:
+                relink.append(row)
+                counts["created"] += 1
+            elif row["links_hash"] != existing["links_hash"]:
+                relink.append(row)
+                counts["relinked"] += 1
+            elif row["content_hash"] != existing["content_hash"]:
+                properties.append(row)
+                counts["updated"] += 1
+            else:
+                counts["unchanged"] += 1
+
+        if relink:
+            self.merge_dimensions(tx, relink)
+            tx.run(SYNC_RELINK_QUERY, batch=relink)
+        if properties:
+            tx.run(SYNC_PROPERTIES_QUERY, batch=properties)
+        if deletes:
+            tx.run(DELETE_SHIPMENTS_QUERY, ids=deletes).consume()
+            counts["deleted"] += len(deletes)
+        return counts
+
+    def delete_shipments(self, tx, ids):
+        return tx.run(DELETE_SHIPMENTS_QUERY, ids=ids).single()["deleted"]
+
+    def sync(self, entries, snapshot=True, batch_size=1000, delete_batch_size=1000):
+        """Bring the graph in line with ``entries`` without clearing it.
+
+        With ``snapshot`` the entries are the complete set of shipments: each
+        is upserted by hash, and shipments missing from it are deleted
+        afterwards, in transactions of ``delete_batch_size`` as a scan of the
+        stored ids finds them. Otherwise they are a change feed of
+        ``{"op": "upsert" | "update" | "delete", ...}`` records (``op``
+        defaults to upsert), applied in order. Returns counts by outcome.
+        """
+        counts = Counter()
+        seen = set()
+        start = time.perf_counter()
+
+        def ops():
+            for entry in entries:
+                op = "upsert" if snapshot else entry.get("op", "upsert")
+                if op not in ("upsert", "update", "delete"):
+                    raise ValueError(f"Unknown op {op!r} for shipment {entry.get('tracking_number')}")
+                if snapshot:
+                    seen.add(entry["tracking_number"])
+                yield op, entry
+
+        for batch in batched_unique(ops(), batch_size, key=lambda item: item[1]["tracking_number"]):
+            with self.connector.session() as session:
+                counts.update(session.execute_write(self.sync_batch, batch))
+
+        if snapshot:
+            if not seen:
+                # Most likely a truncated export, not a request to delete everything
+                raise ValueError("Refusing to sync an empty snapshot: it would delete every shipment")
+            # Stale ids are deleted batch by batch as the scan reaches them, from
+            # their own sessions; the scan may outlast any query timeout
+            pages = self.connector.stream("MATCH (s:Shipment) RETURN s.tracking_number AS id", page_size=10000, timeout=0)
+            stale = (row["id"] for page in pages for row in page if row["id"] not in seen)
+            for ids in batched(stale, delete_batch_size):
+                with self.connector.session() as session:
+                    counts["deleted"] += session.execute_write(self.delete_shipments, ids)
+
+        counts["seconds"] = round(time.perf_counter() - start, 1)
+        return counts
+
     def get_shipment_details(self, tracking_number):
-        with self.connector.driver.session() as session:
+        with self.connector.session() as session:
             result = session.run("""
                 MATCH (s:Shipment {tracking_number: $tracking_number})
                 OPTIONAL MATCH (s)-[:DISPATCHED_FROM]->(d_loc:Location)
@@ -56,30 +398,78 @@ def main(args):
     if args.clear:
         print("🚀 Clearing existing data...")
         populator.connector.clear_database()
+
+    applied = populator.connector.schema.apply()
+    if applied:
+        print(f"🧱 Applied schema migrations: {', '.join(applied)}")
     
-    print("📦 Loading shipment data...")
-    with open(args.input, "r") as f:
-        shipments = json.load(f)
-    
-    with populator.connector.driver.session() as session:
+    first = {}
+
+    def remember_first(shipments):
         for shipment in shipments:
-            session.execute_write(populator.create_graph, shipment)
+            first.setdefault("tracking_number", shipment["tracking_number"])
+            yield shipment
+
+    changed = True
+    if args.sync:
+        print(f"🔄 Syncing shipment data ({args.sync})...")
+        counts = populator.sync(
+            remember_first(iter_shipments(args.input)),
+            snapshot=args.sync == "snapshot",
+            batch_size=args.batch_size,
+            delete_batch_size=args.delete_batch_size,
+        )
+        print(
+            f"   {counts['created']} created, {counts['relinked']} relinked, {counts['updated']} updated, "
+            f"{counts['deleted']} deleted, {counts['unchanged']} unchanged, {counts['missing']} missing "
+            f"({counts['seconds']}s)"
+        )
+        changed = any(counts[outcome] for outcome in ("created", "relinked", "updated", "deleted"))
+        sample = first.get("tracking_number")
+    elif args.bulk:
+        print("📦 Loading shipment data...")
+        populator.bulk_load(
+            remember_first(iter_shipments(args.input)),
+            batch_size=args.batch_size,
+            workers=args.workers,
+        )
+        sample = first.get("tracking_number")
+    else:
+        print("📦 Loading shipment data...")
+        with open(args.input, "r") as f:
+            shipments = json.load(f)
+
+        with populator.connector.session() as session:
+            for shipment in shipments:
+                session.execute_write(populator.create_graph, shipment)
+        sample = shipments[0]['tracking_number'] if shipments else None
     
+    if changed:
+        populator.connector.bump_schema_version()
+        populator.connector.bump_graph_version()
     print("✅ Data loaded into Neo4j!")
     
     # Example verification
-    if args.verify:
-        sample = shipments[0]['tracking_number']
+    if args.verify and sample is not None:
         result = populator.get_shipment_details(sample)
         print(f"\n🔍 Sample verification for {sample}:")
         print(json.dumps(result, indent=2))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Populate Neo4j with shipment data')
-    parser.add_argument('--input', default='data/shipments.json', help='Input JSON file')
+    parser.add_argument('--input', default='data/shipments.json', help='Input JSON or JSONL file')
     parser.add_argument('--password', required=True, help='Neo4j password')
     parser.add_argument('--clear', action='store_true', help='Clear existing data')
     parser.add_argument('--verify', action='store_true', help='Verify sample data')
+    parser.add_argument('--bulk', action='store_true', help='Stream the input and write it in UNWIND batches')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Shipments per bulk batch')
+    parser.add_argument('--workers', type=int, default=1, help='Bulk batches written in parallel')
+    parser.add_argument('--sync', choices=['snapshot', 'feed'],
+                        help='Apply the input incrementally: a full snapshot (shipments missing from it are deleted) '
+                             'or a JSONL change feed of upsert/update/delete records')
+    parser.add_argument('--delete-batch-size', type=int, default=1000, help='Shipments deleted per transaction in a snapshot sync')
     args = parser.parse_args()
+    if args.sync and (args.clear or args.bulk):
+        parser.error('--sync cannot be combined with --clear or --bulk')
     
     main(args)
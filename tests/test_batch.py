@@ -0,0 +1,73 @@
+import asyncio
+from core.batch import INDEX, LIMIT, ROWS, plan_batch, split_results
+from core.database import AsyncNeo4jConnector
+from core.results import Rows, collect_rows
+
+QUERY = "MATCH (s:Shipment)-[:ASSIGNED_TO]->(c:Courier {name: $courier}) RETURN s.tracking_number AS id"
+
+
+def test_identical_queries_merge_into_one_unwind():
+    statements = [(QUERY, {"courier": "A"}), (QUERY, {"courier": "B"})]
+    [group] = plan_batch(statements, [3, 7], limit=11)
+    assert group.indices == [3, 7]
+    assert group.columns == ["id"]
+    assert f"LIMIT ${LIMIT}" in group.query
+    assert group.params[LIMIT] == 11
+    assert group.params[ROWS] == [{"courier": "A", INDEX: 3}, {"courier": "B", INDEX: 7}]
+
+
+def test_unmergeable_queries_stay_single():
+    statements = [(QUERY, {"courier": "A"}), ("MATCH (c:Courier) RETURN c.name AS name", {})]
+    groups = plan_batch(statements, limit=11)
+    assert [g.columns for g in groups] == [None, None]
+    assert all(LIMIT not in g.params for g in groups)
+
+
+def test_split_results_maps_rows_back_to_statements():
+    [group] = plan_batch([(QUERY, {"courier": "A"}), (QUERY, {"courier": "B"})])
+    records = [{INDEX: 1, "id": "T2"}, {INDEX: 0, "id": "T1"}, {INDEX: 1, "id": "T3"}]
+    assert split_results(group, records) == {0: [{"id": "T1"}], 1: [{"id": "T2"}, {"id": "T3"}]}
+
+
+class FakeConnector(AsyncNeo4jConnector):
+    """Answers reads from ``rows_by_courier``; merged queries apply the per-statement LIMIT"""
+
+    def __init__(self, rows_by_courier):
+        self.result_cache = None
+        self.rows_by_courier = rows_by_courier
+        self.single_reads = []
+
+    def _rows(self, query, params):
+        if ROWS not in params:
+            return self.rows_by_courier[params["courier"]]
+        return [
+            {INDEX: row[INDEX], **record}
+            for row in params[ROWS]
+            for record in self.rows_by_courier[row["courier"]][:params.get(LIMIT)]
+        ]
+
+    async def execute_read_many(self, statements, timeout=None):
+        return [collect_rows(self._rows(query, params), *limits) for query, params, *limits in statements]
+
+    async def execute_read(self, query, params=None, timeout=None, max_rows=None, max_bytes=None):
+        self.single_reads.append(params["courier"])
+        return collect_rows(self._rows(query, params), max_rows, max_bytes)
+
+
+def test_one_statement_cannot_starve_the_rest_of_its_group():
+    many = [{"id": f"A{i}"} for i in range(50)]
+    connector = FakeConnector({"A": many, "B": [{"id": "B1"}]})
+    a, b = asyncio.run(connector.execute_batch([(QUERY, {"courier": "A"}), (QUERY, {"courier": "B"})], max_rows=5))
+    assert a == many[:5] and a.truncated
+    assert b == [{"id": "B1"}] and not b.truncated
+    assert connector.single_reads == []
+
+
+def test_statements_cut_off_by_the_byte_budget_run_again_alone():
+    big = [{"id": "A" * 100} for _ in range(3)]
+    connector = FakeConnector({"A": big, "B": [{"id": "B1"}]})
+    a, b = asyncio.run(connector.execute_batch(
+        [(QUERY, {"courier": "A"}), (QUERY, {"courier": "B"})], max_rows=10, max_bytes=150))
+    assert a == big[:1] and a.truncated
+    assert b == [{"id": "B1"}] and not b.truncated
+    assert connector.single_reads == ["B"]
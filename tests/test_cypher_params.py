@@ -0,0 +1,13 @@
+from core.cypher_params import parameterize
+
+
+def test_leading_dot_float_is_lifted():
+    result = parameterize("MATCH (s:Shipment) WHERE s.score > .5 RETURN s")
+    assert result.query == "MATCH (s:Shipment) WHERE s.score > $lit0 RETURN s"
+    assert result.params == {"lit0": 0.5}
+
+
+def test_property_access_and_ranges_are_not_numbers():
+    result = parameterize("MATCH (a)-[*1..3]->(b) WHERE a.x1 = b.y RETURN a.x1")
+    assert result.query == "MATCH (a)-[*1..3]->(b) WHERE a.x1 = b.y RETURN a.x1"
+    assert result.params == {}
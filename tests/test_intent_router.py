@@ -0,0 +1,33 @@
+import pytest
+from core.entities import EntityExtractor
+from core.intent_router import IntentRouter
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter(EntityExtractor())
+
+
+@pytest.mark.parametrize("question", [
+    "What is the expected delivery date of shipment 4000?",
+    "what is the weight of shipment 4000",
+    "What is the customer of 4000?",
+    "How many shipments are expected after 2024-06-01?",
+    "List in transit shipments expected after 2024-06-01",
+    "Which shipments have not been delivered since 2024-06-01?",
+    "Where is shipment 4000 and which courier has it?",
+])
+def test_unsupported_questions_fall_back_to_llm(router, question):
+    assert router.route(question).cypher is None
+
+
+def test_status_question_uses_template(router):
+    route = router.route("What is the status of shipment 4000?")
+    assert route.intent == "shipment_status"
+    assert route.params == {"tracking_number": "4000"}
+
+
+def test_delivered_after_filters_on_delivery_date(router):
+    route = router.route("Which shipments were delivered after 2024-06-01?")
+    assert route.cypher == "MATCH (s:Shipment) WHERE s.delivery_date > $date RETURN s.tracking_number"
+    assert route.params == {"date": "2024-06-01"}
@@ -0,0 +1,162 @@
+import json
+import pytest
+from scripts.populate_neo4j import (
+    DELETE_SHIPMENTS_QUERY, SYNC_LOOKUP_QUERY, SYNC_PROPERTIES_QUERY, SYNC_RELINK_QUERY,
+    Neo4jPopulator, iter_shipments, shipment_row,
+)
+
+
+class Result(list):
+    def consume(self):
+        return None
+
+    def single(self):
+        return self[0]
+
+
+class Tx:
+    """Answers SYNC_LOOKUP_QUERY from ``stored`` and records every other statement"""
+
+    def __init__(self, stored):
+        self.stored = stored
+        self.runs = []
+
+    def run(self, query, **params):
+        if query is SYNC_LOOKUP_QUERY:
+            return Result(self.stored[id] for id in params["ids"] if id in self.stored)
+        self.runs.append((query, params))
+        return Result([{"deleted": len(params.get("ids", []))}])
+
+    def ran(self, query):
+        return [params for q, params in self.runs if q is query]
+
+
+def shipment(tracking_number, **changes):
+    return {
+        "tracking_number": tracking_number, "status": "In Transit", "dispatch_date": "2024-05-01",
+        "expected_delivery_date": "2024-05-10", "delivery_date": None, "dispatch_location": "Austin",
+        "delivery_location": "San Diego", "courier": "SwiftExpress", "customer": "Acme", **changes,
+    }
+
+
+def stored(entry):
+    row = shipment_row(entry)
+    return {"id": row["tracking_number"], "content_hash": row["content_hash"],
+            "links_hash": row["links_hash"], "props": row["props"]}
+
+
+@pytest.fixture
+def populator():
+    return object.__new__(Neo4jPopulator)
+
+
+def test_upserts_are_classified_against_stored_hashes(populator):
+    tx = Tx({id: stored(shipment(id)) for id in ("T2", "T3", "T4")})
+    counts = populator.sync_batch(tx, [
+        ("upsert", shipment("T1")),
+        ("upsert", shipment("T2", courier="FastShip")),
+        ("upsert", shipment("T3", status="Delayed")),
+        ("upsert", shipment("T4")),
+    ])
+    assert counts == {"created": 1, "relinked": 1, "updated": 1, "unchanged": 1}
+    [relink] = tx.ran(SYNC_RELINK_QUERY)
+    assert [row["tracking_number"] for row in relink["batch"]] == ["T1", "T2"]
+    [properties] = tx.ran(SYNC_PROPERTIES_QUERY)
+    assert [row["tracking_number"] for row in properties["batch"]] == ["T3"]
+
+
+def test_updates_and_deletes_of_unknown_shipments_are_missing(populator):
+    tx = Tx({"T1": stored(shipment("T1"))})
+    counts = populator.sync_batch(tx, [
+        ("update", {"tracking_number": "T1", "status": "Delivered", "delivery_date": "2024-05-09"}),
+        ("update", {"tracking_number": "T9", "status": "Delivered"}),
+        ("delete", {"tracking_number": "T8"}),
+    ])
+    assert counts == {"updated": 1, "missing": 2}
+    [properties] = tx.ran(SYNC_PROPERTIES_QUERY)
+    assert properties["batch"][0]["props"]["delivery_date"] == "2024-05-09"
+    assert tx.ran(DELETE_SHIPMENTS_QUERY) == []
+
+
+def test_update_that_changes_nothing_is_unchanged_and_delete_removes(populator):
+    tx = Tx({"T1": stored(shipment("T1")), "T2": stored(shipment("T2"))})
+    counts = populator.sync_batch(tx, [
+        # delivery_date only counts once a shipment is Delivered
+        ("update", {"tracking_number": "T1", "delivery_date": "2024-05-09"}),
+        ("delete", {"tracking_number": "T2"}),
+    ])
+    assert counts == {"unchanged": 1, "deleted": 1}
+    assert tx.ran(DELETE_SHIPMENTS_QUERY) == [{"ids": ["T2"]}]
+    assert tx.ran(SYNC_PROPERTIES_QUERY) == []
+
+
+class Session:
+    def __init__(self, connector):
+        self.connector = connector
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, work, *args):
+        return work(self.connector.tx, *args)
+
+
+class Connector:
+    """Stores shipments in ``tx``; ``events`` records scanned pages and delete batches in order"""
+
+    def __init__(self, ids):
+        self.tx = Tx({id: stored(shipment(id)) for id in ids})
+        self.events = []
+
+    def session(self):
+        return Session(self)
+
+    def stream(self, query, params=None, page_size=100, timeout=None):
+        self.events.append(("timeout", timeout))
+        ids = sorted(self.tx.stored)
+        for start in range(0, len(ids), 2):
+            self.events.append(("page", start))
+            yield [{"id": id} for id in ids[start:start + 2]]
+
+
+def test_snapshot_deletes_stale_shipments_while_scanning(populator):
+    populator.connector = Connector(["T1", "T2", "T3", "T4", "T5"])
+    original = populator.delete_shipments
+
+    def delete_shipments(tx, ids):
+        populator.connector.events.append(("delete", ids))
+        return original(tx, ids)
+
+    populator.delete_shipments = delete_shipments
+    counts = populator.sync([shipment("T1")], snapshot=True, delete_batch_size=2)
+    assert counts["deleted"] == 4
+    assert populator.connector.events == [
+        ("timeout", 0), ("page", 0), ("page", 2), ("delete", ["T2", "T3"]), ("page", 4), ("delete", ["T4", "T5"]),
+    ]
+
+
+def test_empty_snapshot_is_refused(populator):
+    populator.connector = Connector(["T1"])
+    with pytest.raises(ValueError):
+        populator.sync([], snapshot=True)
+
+
+def write_array(tmp_path, text):
+    path = tmp_path / "shipments.json"
+    path.write_text(text)
+    return str(path)
+
+
+def test_iter_shipments_reads_objects_split_across_chunks(tmp_path):
+    shipments = [shipment(f"T{i}", customer="x" * 50) for i in range(20)]
+    path = write_array(tmp_path, json.dumps(shipments))
+    assert list(iter_shipments(path, chunk_size=64)) == shipments
+
+
+def test_iter_shipments_fails_on_malformed_input(tmp_path):
+    path = write_array(tmp_path, '[{"tracking_number": "T1"}, {"tracking_number": T2}, ' + '{"a": 1}, ' * 200 + ']')
+    with pytest.raises(ValueError):
+        list(iter_shipments(path, chunk_size=16, max_object_size=256))
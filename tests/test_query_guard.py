@@ -0,0 +1,37 @@
+from core.query_guard import QueryGuard
+
+
+def plan(operator, rows, children=(), **args):
+    return {"operatorType": f"{operator}@neo4j", "args": {"EstimatedRows": float(rows), **args},
+            "children": list(children)}
+
+
+def guard():
+    return QueryGuard(None, max_cartesian_rows=10000, large_label_rows=100000, max_estimated_rows=100000)
+
+
+def test_large_cartesian_product_is_rejected():
+    verdict = guard().judge(
+        "MATCH (a:Shipment), (b:Shipment) RETURN a, b LIMIT 10",
+        plan("ProduceResults", 10, [plan("CartesianProduct", 250000, [plan("NodeByLabelScan", 500)])]),
+    )
+    assert verdict.action == "reject"
+    assert "CartesianProduct of ~250000 rows" in verdict.reasons
+
+
+def test_small_cartesian_product_is_throttled():
+    verdict = guard().judge("MATCH (a), (b) RETURN a LIMIT 1", plan("ProduceResults", 1, [plan("CartesianProduct", 50)]))
+    assert verdict.action == "throttle"
+
+
+def test_large_label_scan_is_throttled():
+    scan = plan("NodeByLabelScan", 200000, Details="s:Shipment")
+    verdict = guard().judge("MATCH (s:Shipment) RETURN count(s)", plan("ProduceResults", 1, [scan]))
+    assert verdict.action == "throttle"
+    assert verdict.reasons == ["NodeByLabelScan of s:Shipment (~200000 nodes)"]
+
+
+def test_huge_estimate_is_allowed_when_pageable_and_rejected_otherwise():
+    root = plan("ProduceResults", 500000, [plan("NodeIndexSeek", 500000)])
+    assert guard().judge("MATCH (s:Shipment) RETURN s", root).action == "allow"
+    assert guard().judge("MATCH (s:Shipment) RETURN s LIMIT 600000", root).action == "reject"
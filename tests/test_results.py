@@ -0,0 +1,32 @@
+from bots.base_bot import BaseBot
+from core.results import inject_limit, is_ordered
+
+
+class Bot(BaseBot):
+    def __init__(self):
+        self.max_rows, self.max_bytes = 10, 1000
+
+    def generate_cypher(self, natural_query):
+        return ""
+
+
+def test_inject_limit_leaves_bounded_queries_alone():
+    assert inject_limit("MATCH (s:Shipment) RETURN s LIMIT 5") is None
+    assert inject_limit("MATCH (s:Shipment) RETURN s").endswith("SKIP $page_skip LIMIT $page_limit")
+
+
+def test_is_ordered_only_looks_at_the_final_return():
+    assert is_ordered("MATCH (s:Shipment) RETURN s.tracking_number AS id ORDER BY id")
+    assert not is_ordered("MATCH (s:Shipment) RETURN s.tracking_number AS id")
+    assert not is_ordered("CALL { MATCH (s:Shipment) RETURN s ORDER BY s.weight } RETURN s")
+
+
+def test_unordered_queries_are_limited_but_not_pageable():
+    query, params, pageable = Bot().bound_cypher("MATCH (s:Shipment) RETURN s.tracking_number AS id")
+    assert query.endswith("LIMIT $page_limit") and params["page_limit"] == 11
+    assert not pageable
+
+
+def test_ordered_queries_are_pageable():
+    _, params, pageable = Bot().bound_cypher("MATCH (s:Shipment) RETURN s.tracking_number AS id ORDER BY id", skip=10)
+    assert pageable and params["page_skip"] == 10
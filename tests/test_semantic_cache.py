@@ -0,0 +1,37 @@
+import pytest
+from core.embeddings import HashingEmbeddings
+from core.entities import EntityExtractor
+from core.semantic_cache import SemanticCache
+
+
+@pytest.fixture
+def cache():
+    extractor = EntityExtractor()
+    extractor.set_vocabulary({"location": ["San Diego", "Austin"], "courier": ["SwiftExpress"]})
+    return SemanticCache(embeddings=HashingEmbeddings(), extractor=extractor, max_entries=16, storage="float32")
+
+
+def test_paraphrase_with_new_entity_hits(cache):
+    cache.store("List shipments expected to arrive before 2024-06-01",
+                "MATCH (s:Shipment) WHERE s.expected_delivery_date < '2024-06-01' RETURN s.tracking_number")
+    assert cache.lookup("List shipments expected to arrive before 2024-05-01") == (
+        "MATCH (s:Shipment) WHERE s.expected_delivery_date < '2024-05-01' RETURN s.tracking_number"
+    )
+
+
+def test_before_and_after_do_not_share_an_entry(cache):
+    cache.store("List shipments expected to arrive before 2024-06-01",
+                "MATCH (s:Shipment) WHERE s.expected_delivery_date < '2024-06-01' RETURN s.tracking_number")
+    assert cache.lookup("List shipments expected to arrive after 2024-07-01") is None
+
+
+def test_from_and_to_do_not_share_an_entry(cache):
+    cache.store("Show all shipments going to San Diego",
+                "MATCH (s:Shipment)-[:DELIVERED_TO]->(l:Location {name: 'San Diego'}) RETURN s.tracking_number")
+    assert cache.lookup("Show all shipments coming from Austin") is None
+
+
+def test_negation_does_not_share_an_entry(cache):
+    cache.store("Which shipments were delivered by SwiftExpress",
+                "MATCH (s:Shipment)-[:ASSIGNED_TO]->(c:Courier {name: 'SwiftExpress'}) RETURN s.tracking_number")
+    assert cache.lookup("Which shipments were not delivered by SwiftExpress") is None